@@ -0,0 +1,49 @@
+"""Convert JSON columns to JSONB with GIN metadata indexes
+
+Revision ID: 4c7be02d9a1f
+Revises: d19e6428fa70
+Create Date: 2025-01-24 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision = '4c7be02d9a1f'
+down_revision = 'd19e6428fa70'
+branch_labels = None
+depends_on = None
+
+# (table, column) pairs stored as text JSON today
+_JSON_COLUMNS = [
+    ('clients', 'client_metadata'),
+    ('client_auth_events', 'details'),
+    ('payment_requests', 'payment_metadata'),
+    ('provider_invoices', 'raw_create_response'),
+    ('provider_invoices', 'raw_last_status'),
+    ('payment_events', 'payload'),
+]
+
+
+def upgrade() -> None:
+    # JSONB stores a parsed binary representation, avoiding a JSON re-parse
+    # on every read and enabling GIN-indexed containment queries
+    for table, column in _JSON_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE jsonb USING {column}::jsonb")
+
+    # jsonb_path_ops is smaller and faster than the default opclass when only
+    # @> containment is needed; built CONCURRENTLY so the GIN build doesn't
+    # block payment creation (the ALTERs above rewrite the tables regardless,
+    # but the index need not extend the outage)
+    create_index_concurrently(
+        'idx_payment_metadata_gin', 'payment_requests',
+        'payment_metadata jsonb_path_ops', using='gin',
+    )
+
+
+def downgrade() -> None:
+    drop_index_concurrently('idx_payment_metadata_gin')
+    for table, column in _JSON_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE json USING {column}::json")
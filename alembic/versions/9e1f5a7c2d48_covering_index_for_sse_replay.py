@@ -0,0 +1,37 @@
+"""Covering index for SSE replay scans
+
+Revision ID: 9e1f5a7c2d48
+Revises: 7a5d3e91c8b2
+Create Date: 2025-01-24 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision = '9e1f5a7c2d48'
+down_revision = '7a5d3e91c8b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The replay query is WHERE payment_request_id = ? AND seq > ? ORDER BY
+    # seq. INCLUDE-ing event_type and created_at lets the planner answer it
+    # index-only without a heap fetch per row. The old (payment_request_id,
+    # seq) index becomes a strict subset and is dropped. payment_events is
+    # the hottest table in the schema, so both steps run CONCURRENTLY.
+    create_index_concurrently(
+        'idx_payment_events_replay', 'payment_events', 'payment_request_id, seq',
+        include='event_type, created_at',
+    )
+    drop_index_concurrently('idx_payment_events_payment_seq')
+
+
+def downgrade() -> None:
+    create_index_concurrently(
+        'idx_payment_events_payment_seq', 'payment_events', 'payment_request_id, seq'
+    )
+    drop_index_concurrently('idx_payment_events_replay')
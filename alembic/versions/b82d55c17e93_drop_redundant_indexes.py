@@ -0,0 +1,30 @@
+"""Drop indexes covered by composite prefixes
+
+Revision ID: b82d55c17e93
+Revises: f3a91b27c054
+Create Date: 2025-01-24 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b82d55c17e93'
+down_revision = 'f3a91b27c054'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # idx_payment_events_payment_seq (payment_request_id, seq) already serves
+    # lookups by payment_request_id via the leftmost-prefix rule; likewise
+    # idx_payment_client_created (client_id, created_at) covers client_id.
+    # Dropping the single-column duplicates removes index maintenance on the
+    # two hottest write tables.
+    op.drop_index('ix_payment_events_payment_request_id', table_name='payment_events')
+    op.drop_index('ix_payment_requests_client_id', table_name='payment_requests')
+
+
+def downgrade() -> None:
+    op.create_index('ix_payment_requests_client_id', 'payment_requests', ['client_id'])
+    op.create_index('ix_payment_events_payment_request_id', 'payment_events', ['payment_request_id'])
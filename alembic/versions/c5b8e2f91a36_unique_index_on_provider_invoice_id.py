@@ -0,0 +1,42 @@
+"""Make the provider_invoice_id index unique
+
+Revision ID: c5b8e2f91a36
+Revises: 9e1f5a7c2d48
+Create Date: 2025-01-24 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision = 'c5b8e2f91a36'
+down_revision = '9e1f5a7c2d48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Every BTCPay webhook looks up the payment by provider_invoice_id; a
+    # unique index lets the planner stop at the first match and guards
+    # against duplicate invoice rows. The name matches what the model's
+    # index=True declares, so the old index is dropped first and the
+    # unique replacement built CONCURRENTLY - webhook lookups fall back
+    # to a scan for the duration of the build instead of blocking writes.
+    drop_index_concurrently('ix_provider_invoices_provider_invoice_id')
+    create_index_concurrently(
+        'ix_provider_invoices_provider_invoice_id',
+        'provider_invoices',
+        'provider_invoice_id',
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    drop_index_concurrently('ix_provider_invoices_provider_invoice_id')
+    create_index_concurrently(
+        'ix_provider_invoices_provider_invoice_id',
+        'provider_invoices',
+        'provider_invoice_id',
+    )
@@ -0,0 +1,36 @@
+"""Partial index for the payment monitor scan
+
+Revision ID: d19e6428fa70
+Revises: b82d55c17e93
+Create Date: 2025-01-24 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migration_helpers import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision = 'd19e6428fa70'
+down_revision = 'b82d55c17e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The monitor only cares about non-terminal payments; a partial index on
+    # monitor_until stays proportional to the active set instead of indexing
+    # every finalized row. Built CONCURRENTLY: payment_requests takes live
+    # writes and a blocking build would stall payment creation.
+    create_index_concurrently(
+        'idx_payment_active_monitor', 'payment_requests', 'monitor_until',
+        where="status IN ('CREATED', 'PENDING')",
+    )
+    drop_index_concurrently('idx_payment_status_monitor')
+
+
+def downgrade() -> None:
+    create_index_concurrently(
+        'idx_payment_status_monitor', 'payment_requests', 'status, monitor_until'
+    )
+    drop_index_concurrently('idx_payment_active_monitor')
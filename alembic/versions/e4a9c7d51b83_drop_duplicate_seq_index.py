@@ -0,0 +1,28 @@
+"""Drop duplicate btree on payment_events.seq
+
+Revision ID: e4a9c7d51b83
+Revises: c5b8e2f91a36
+Create Date: 2025-02-12 09:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9c7d51b83'
+down_revision = 'c5b8e2f91a36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The unique index ix_payment_events_seq already serves every equality
+    # and range scan on seq; the model additionally declared a plain
+    # idx_payment_events_seq, which create_all-provisioned databases carry
+    # as a second btree maintained on every event insert. Migrated
+    # databases never had it, hence IF EXISTS.
+    op.execute("DROP INDEX IF EXISTS idx_payment_events_seq")
+
+
+def downgrade() -> None:
+    op.create_index('idx_payment_events_seq', 'payment_events', ['seq'])
@@ -0,0 +1,25 @@
+"""Add sse_payload to payment_events
+
+Revision ID: f3a91b27c054
+Revises: c624136a949a
+Create Date: 2025-01-24 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f3a91b27c054'
+down_revision = 'c624136a949a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Pre-serialized SSEEventData JSON, written once at event-insert time so
+    # the SSE replay path can stream it without rebuilding per row
+    op.add_column('payment_events', sa.Column('sse_payload', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('payment_events', 'sse_payload')
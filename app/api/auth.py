@@ -1,31 +1,48 @@
 """Authentication endpoints."""
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 from ipaddress import ip_address
 
-from app.core.security import hash_password, verify_password, create_access_token
-from app.core.rate_limit import limiter, get_auth_rate_limit_key
+from app.core.security import (
+    hash_password,
+    verify_password,
+    password_needs_rehash,
+    create_access_token,
+)
+from app.core.rate_limit import auth_rate_limiter
 from app.db.session import get_db
 from app.db.models import Client, ClientAuthEvent
 from app.schemas.auth import TokenRequest, TokenResponse
 
 router = APIRouter()
 
+# Precompiled lookup reused across requests; machine_id is unique so
+# scalar_one_or_none needs no LIMIT
+_CLIENT_BY_MACHINE_ID = select(Client).where(Client.machine_id == bindparam("machine_id"))
 
-@router.post("/auth/token", response_model=TokenResponse)
-@limiter.limit("5/minute")
+
+@router.post(
+    "/auth/token",
+    response_model=TokenResponse,
+    dependencies=[Depends(auth_rate_limiter)],
+)
 def create_token(
     request: Request,
     token_request: TokenRequest,
     db: Session = Depends(get_db),
 ):
     """Authenticate client and issue JWT token."""
-    # Get client IP for logging and allowlist check
+    # Hoist per-request values used by every branch below
     client_ip = request.client.host if request.client else None
+    user_agent = request.headers.get("user-agent")
+    now = datetime.now(timezone.utc)
     
     # Find client by machine_id
-    client = db.query(Client).filter(Client.machine_id == token_request.machine_id).first()
+    client = db.execute(
+        _CLIENT_BY_MACHINE_ID, {"machine_id": token_request.machine_id}
+    ).scalar_one_or_none()
     
     if not client:
         # Log failed attempt
@@ -34,9 +51,10 @@ def create_token(
             client_id=None,
             event_type="LOGIN_FAIL",
             ip=client_ip,
-            user_agent=request.headers.get("user-agent"),
+            user_agent=user_agent,
             details={"reason": "CLIENT_NOT_FOUND", "machine_id": token_request.machine_id},
         )
+        db.commit()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
@@ -49,9 +67,10 @@ def create_token(
             client_id=client.id,
             event_type="LOGIN_FAIL",
             ip=client_ip,
-            user_agent=request.headers.get("user-agent"),
+            user_agent=user_agent,
             details={"reason": "INVALID_PASSWORD"},
         )
+        db.commit()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
@@ -64,9 +83,10 @@ def create_token(
             client_id=client.id,
             event_type="LOGIN_FAIL",
             ip=client_ip,
-            user_agent=request.headers.get("user-agent"),
+            user_agent=user_agent,
             details={"reason": "CLIENT_INACTIVE"},
         )
+        db.commit()
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Client is inactive",
@@ -77,16 +97,17 @@ def create_token(
         if client_ip:
             try:
                 ip_obj = ip_address(client_ip)
-                allowed = any(ip_obj in network for network in client.allowed_ips)
+                allowed = any(ip_obj in network for network in client.allowed_networks)
                 if not allowed:
                     _log_auth_event(
                         db,
                         client_id=client.id,
                         event_type="LOGIN_FAIL",
                         ip=client_ip,
-                        user_agent=request.headers.get("user-agent"),
+                        user_agent=user_agent,
                         details={"reason": "IP_NOT_ALLOWED"},
                     )
+                    db.commit()
                     raise HTTPException(
                         status_code=status.HTTP_403_FORBIDDEN,
                         detail="IP address not allowed",
@@ -95,6 +116,11 @@ def create_token(
                 # Invalid IP format
                 pass
     
+    # Lazily upgrade hashes created with older Argon2 parameters; the
+    # rehash rides along in the same commit as the auth event
+    if password_needs_rehash(client.password_hash):
+        client.password_hash = hash_password(token_request.password)
+
     # Generate JWT token
     token = create_access_token(
         client_id=str(client.id),
@@ -102,7 +128,7 @@ def create_token(
     )
     
     # Update last_seen_at
-    client.last_seen_at = datetime.now(timezone.utc)
+    client.last_seen_at = now
     
     # Log successful authentication
     _log_auth_event(
@@ -110,7 +136,7 @@ def create_token(
         client_id=client.id,
         event_type="LOGIN_OK",
         ip=client_ip,
-        user_agent=request.headers.get("user-agent"),
+        user_agent=user_agent,
         details={"device_info": token_request.device_info},
     )
     
@@ -131,7 +157,11 @@ def _log_auth_event(
     user_agent: str = None,
     details: dict = None,
 ):
-    """Helper to log authentication events."""
+    """Helper to log authentication events.
+
+    Only stages the event; the caller owns the commit so the auth event,
+    last_seen_at update and anything else land in a single transaction.
+    """
     event = ClientAuthEvent(
         client_id=client_id,
         event_type=event_type,
@@ -140,5 +170,4 @@ def _log_auth_event(
         details=details or {},
     )
     db.add(event)
-    db.commit()
 
@@ -1,26 +1,34 @@
 """FastAPI dependencies."""
+import threading
 from typing import Optional
 from uuid import UUID
 
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 
 from app.core.security import verify_token
-from app.core.rate_limit import limiter
 from app.db.session import get_db
 from app.db.models import Client
 
 security = HTTPBearer()
 
+# Short-lived cache of verified tokens so chatty clients skip the JWT verify
+# and Client lookup on every request. The TTL bounds how long a deactivated
+# client can keep using an already-verified token. TTLCache is not
+# thread-safe and sync endpoints run concurrently in the threadpool, so
+# every access holds the lock (same idiom as _key_lock in core.security).
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+_token_cache_lock = threading.Lock()
 
-def get_current_client(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> UUID:
-    """Dependency to get current authenticated client ID from JWT."""
-    token = credentials.credentials
-    
+# Precompiled lookup reused across requests
+_CLIENT_BY_ID = select(Client).where(Client.id == bindparam("client_id"))
+
+
+def _authenticate_client(token: str, db: Session) -> Client:
+    """Verify the JWT and load the active client it belongs to."""
     payload = verify_token(token)
     if not payload:
         raise HTTPException(
@@ -28,11 +36,11 @@ def get_current_client(
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     client_id = UUID(payload["sub"])
-    
+
     # Verify client still exists and is active
-    client = db.query(Client).filter(Client.id == client_id).first()
+    client = db.execute(_CLIENT_BY_ID, {"client_id": client_id}).scalar_one_or_none()
     if not client:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -43,8 +51,26 @@ def get_current_client(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Client is inactive",
         )
-    
-    return client_id
+
+    return client
+
+
+def get_current_client(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> UUID:
+    """Dependency to get current authenticated client ID from JWT."""
+    token = credentials.credentials
+
+    with _token_cache_lock:
+        cached_client_id = _token_cache.get(token)
+    if cached_client_id is not None:
+        return cached_client_id
+
+    client = _authenticate_client(token, db)
+    with _token_cache_lock:
+        _token_cache[token] = client.id
+    return client.id
 
 
 def get_current_client_obj(
@@ -53,29 +79,8 @@ def get_current_client_obj(
 ) -> Client:
     """Dependency to get current authenticated client object."""
     token = credentials.credentials
-    
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    client_id = UUID(payload["sub"])
-    
-    # Verify client still exists and is active
-    client = db.query(Client).filter(Client.id == client_id).first()
-    if not client:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Client not found",
-        )
-    if not client.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Client is inactive",
-        )
-    
-    return client
 
+    client = _authenticate_client(token, db)
+    with _token_cache_lock:
+        _token_cache[token] = client.id
+    return client
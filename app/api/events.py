@@ -1,6 +1,7 @@
 """Server-Sent Events (SSE) endpoints for real-time payment updates."""
 import json
 import asyncio
+import logging
 from typing import Optional
 from uuid import UUID
 from datetime import datetime, timezone
@@ -8,19 +9,29 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, Request, Header
 from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
-from sqlalchemy.orm import Session
-import redis
+from sqlalchemy.orm import Session, selectinload
+import redis.asyncio as aioredis
 
 from app.api.deps import get_current_client
 from app.db.session import get_db
 from app.db.models import PaymentRequest, PaymentEvent, ProviderInvoice
-from app.schemas.events import SSEEventData, PaymentInfoSchema, InvoiceInfoSchema, ProviderStatusSchema, AmountSchema
+from app.services.notifications import build_sse_event, map_event_type_to_sse
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
-# Redis client for pub/sub
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+# Async Redis client for event streams
+redis_client = aioredis.from_url(settings.redis_url, decode_responses=True)
+
+# Seconds of idle time before a keepalive comment is sent. This doubles as
+# the stream read block timeout, so the Redis socket wait is the only timer
+# each connection runs - no per-connection bookkeeping between events.
+KEEPALIVE_INTERVAL = 15
+
+# Rows fetched per replay batch; bounds per-connection memory during replay
+REPLAY_BATCH = 200
 
 
 @router.get("/events/stream")
@@ -32,156 +43,116 @@ async def event_stream(
 ):
     """
     SSE stream for payment events for the authenticated client.
-    
+
     Supports reconnection with Last-Event-ID header for replay.
     """
     async def event_generator():
         # Replay missed events if Last-Event-ID provided
-        if last_event_id:
-            missed_events = db.query(PaymentEvent).join(PaymentRequest).filter(
+        def _load_missed_batch(after_seq: int):
+            # Keyset-paginated batch: seq > cursor rides the replay index,
+            # so each batch is an index range scan regardless of backlog
+            # size, and only REPLAY_BATCH rows are materialized at once
+            query = db.query(PaymentEvent).options(
+                selectinload(PaymentEvent.payment_request)
+                .selectinload(PaymentRequest.provider_invoice)
+            ).join(PaymentRequest).filter(
                 PaymentRequest.client_id == client_id,
-                PaymentEvent.seq > last_event_id,
-            ).order_by(PaymentEvent.seq).all()
-            
-            for event in missed_events:
-                event_data = _build_sse_event_data(event, db)
-                if event_data:
-                    yield {
-                        "id": str(event.seq),
-                        "event": _map_event_type_to_sse(event.event_type),
-                        "data": event_data.model_dump_json(),
-                    }
-        
-        # Subscribe to Redis pub/sub for new events
-        pubsub = redis_client.pubsub()
-        channel = f"client:{client_id}:events"
-        pubsub.subscribe(channel)
-        
+                PaymentEvent.seq > after_seq,
+            ).order_by(PaymentEvent.seq).limit(REPLAY_BATCH)
+
+            batch = []
+            for event in query:
+                # Prefer the payload serialized at write time; fall back to
+                # rebuilding for rows that predate sse_payload
+                if event.sse_payload:
+                    sse_event = map_event_type_to_sse(event.event_type)
+                    payload = event.sse_payload
+                else:
+                    sse_event, payload = build_sse_event(event)
+                batch.append({
+                    "id": str(event.seq),
+                    "event": sse_event,
+                    "data": payload,
+                })
+            return batch
+
+        stream_key = f"client:{client_id}:events"
         last_sent_seq = last_event_id or 0
-        last_keepalive = datetime.now(timezone.utc)
-        
-        try:
-            while True:
-                # Check for disconnection
-                if await request.is_disconnected():
-                    break
-                
-                # Check Redis for new messages (non-blocking)
-                message = pubsub.get_message(timeout=0.1)
-                if message and message["type"] == "message":
-                    try:
-                        data = json.loads(message["data"])
-                        payment_id = UUID(data["payment_id"])
-                        event_seq = data["event_seq"]
-                        
-                        # Only send if we haven't sent this event yet
-                        if event_seq > last_sent_seq:
-                            # Query event from DB
-                            event = db.query(PaymentEvent).filter(
-                                PaymentEvent.seq == event_seq,
-                                PaymentEvent.payment_request_id == payment_id,
-                            ).first()
-                            
-                            if event:
-                                # Verify ownership
-                                payment = event.payment_request
-                                if payment.client_id == client_id:
-                                    event_data = _build_sse_event_data(event, db)
-                                    if event_data:
-                                        yield {
-                                            "id": str(event.seq),
-                                            "event": _map_event_type_to_sse(event.event_type),
-                                            "data": event_data.model_dump_json(),
-                                        }
-                                        last_sent_seq = event_seq
-                    except Exception as e:
-                        print(f"Error processing SSE message: {e}")
-                        continue
-                
-                # Send keepalive every 15 seconds
-                now = datetime.now(timezone.utc)
-                if (now - last_keepalive).total_seconds() >= 15:
-                    yield {
-                        "event": "keepalive",
-                        "data": json.dumps({"ts": now.isoformat()}),
-                    }
-                    last_keepalive = now
-                
-                # Small sleep to prevent busy loop
-                await asyncio.sleep(0.1)
-        
-        finally:
-            pubsub.unsubscribe(channel)
-            pubsub.close()
-    
-    return EventSourceResponse(event_generator())
 
+        if last_event_id:
+            # Entry ids are "{seq}-0", so when the stream still holds the
+            # entry right after Last-Event-ID the XREAD below replays the
+            # gap from Redis for free. Only a trimmed (or empty) stream
+            # needs the Postgres replay path.
+            oldest = await redis_client.xrange(stream_key, count=1)
+            stream_covers_gap = (
+                bool(oldest)
+                and int(oldest[0][0].split("-")[0]) <= last_event_id + 1
+            )
+            if not stream_covers_gap:
+                # Run the synchronous SQLAlchemy work in a worker thread so
+                # the event loop stays free; streaming batch-by-batch means
+                # the client sees the first frames before the full backlog
+                # has been read
+                while True:
+                    batch = await asyncio.to_thread(_load_missed_batch, last_sent_seq)
+                    for item in batch:
+                        yield item
+                        last_sent_seq = int(item["id"])
+                    if len(batch) < REPLAY_BATCH:
+                        break
 
+        # Resume the stream read after the last event the client has seen
+        last_stream_id = f"{last_sent_seq}-0"
 
+        # Monotonic timestamp of the last frame sent, tracked with the loop
+        # clock (cheaper than tz-aware datetimes in the hot loop)
+        loop = asyncio.get_running_loop()
+        last_yield_mono = loop.time()
 
-def _build_sse_event_data(event: PaymentEvent, db: Session) -> Optional[SSEEventData]:
-    """Build SSE event data from PaymentEvent."""
-    payment = event.payment_request
-    provider_invoice = payment.provider_invoice
-    
-    # Build payment info
-    payment_info = PaymentInfoSchema(
-        payment_id=payment.id,
-        external_code=payment.external_code,
-        status=payment.status,
-        status_reason=payment.status_reason,
-        created_at=payment.created_at,
-        finalized_at=payment.finalized_at,
-        monitor_until=payment.monitor_until,
-        amount=AmountSchema(
-            amount=payment.amount,
-            currency=payment.currency,
-        ),
-        payment_method=payment.payment_method,
-    )
-    
-    # Build invoice info if available
-    invoice_info = None
-    if provider_invoice:
-        invoice_info = InvoiceInfoSchema(
-            provider=provider_invoice.provider,
-            provider_invoice_id=provider_invoice.provider_invoice_id,
-            checkout_link=provider_invoice.checkout_link,
-            bolt11=provider_invoice.bolt11,
-            expires_at=provider_invoice.expires_at,
-        )
-    
-    # Build provider status if available
-    provider_status = None
-    if provider_invoice and provider_invoice.raw_last_status:
-        status_data = provider_invoice.raw_last_status
-        provider_status = ProviderStatusSchema(
-            btcpay_status=status_data.get("status"),
-            seen_at=provider_invoice.updated_at or datetime.now(timezone.utc),
-            source=event.source,
-        )
-    
-    return SSEEventData(
-        event_id=event.seq,
-        event=_map_event_type_to_sse(event.event_type),
-        emitted_at=event.created_at,
-        payment=payment_info,
-        invoice=invoice_info,
-        provider_status=provider_status,
-    )
-
-
-def _map_event_type_to_sse(event_type: str) -> str:
-    """Map internal event type to SSE event name."""
-    mapping = {
-        PaymentEvent.EVENT_CREATED: "payment.created",
-        PaymentEvent.EVENT_PROVIDER_INVOICE_CREATED: "payment.invoice_created",
-        PaymentEvent.EVENT_WEBHOOK_RECEIVED: "payment.status_changed",
-        PaymentEvent.EVENT_PAID: "payment.paid",
-        PaymentEvent.EVENT_TIMED_OUT: "payment.timed_out",
-        PaymentEvent.EVENT_EXPIRED: "payment.expired",
-        PaymentEvent.EVENT_FAILED: "payment.failed",
-        PaymentEvent.EVENT_CANCELED: "payment.canceled",
-    }
-    return mapping.get(event_type, "payment.status_changed")
+        while True:
+            # Check for disconnection
+            if await request.is_disconnected():
+                break
 
+            # Sleep on the Redis socket until entries arrive or the
+            # keepalive interval elapses (BLOCK takes milliseconds)
+            response = await redis_client.xread(
+                {stream_key: last_stream_id},
+                count=100,
+                block=KEEPALIVE_INTERVAL * 1000,
+            )
+            for _key, entries in response or ():
+                for entry_id, fields in entries:
+                    last_stream_id = entry_id
+                    try:
+                        event_seq = int(fields["event_seq"])
+                        payload = fields.get("payload")
+
+                        # The stream is scoped to this client, so no
+                        # ownership query is needed: just skip already-sent
+                        # events and stream the pre-serialized payload
+                        if payload and event_seq > last_sent_seq:
+                            yield {
+                                "id": str(event_seq),
+                                "event": fields.get("event", "payment.status_changed"),
+                                "data": payload,
+                            }
+                            last_sent_seq = event_seq
+                            last_yield_mono = loop.time()
+                    except Exception as e:
+                        logger.warning("Error processing SSE message: %s", e)
+                        continue
+
+            if loop.time() - last_yield_mono >= KEEPALIVE_INTERVAL:
+                # Nothing has been streamed for a full keepalive
+                # interval, so keep the connection warm
+                yield {
+                    "event": "keepalive",
+                    "data": json.dumps(
+                        {"ts": datetime.now(timezone.utc).isoformat()}
+                    ),
+                }
+                last_yield_mono = loop.time()
+
+    return EventSourceResponse(event_generator())
@@ -1,4 +1,5 @@
 """Health check endpoint."""
+import time
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
@@ -8,20 +9,43 @@ from app.db.session import get_db
 
 router = APIRouter()
 
+# How long a probe result stays valid. Liveness probes hit this endpoint
+# every few seconds per replica; caching the result briefly keeps the DB
+# from seeing one SELECT 1 per probe.
+_CHECK_TTL_SECONDS = 1.0
+
+# (monotonic timestamp of last real check, db status at that time)
+_last_check: tuple = (0.0, "ok")
+
+
+@router.get("/health/live")
+def liveness_check():
+    """Liveness probe: process is up. No DB round-trip."""
+    return {"status": "ok"}
+
 
 @router.get("/health")
+@router.get("/health/ready")
 def health_check(db: Session = Depends(get_db)):
-    """Health check endpoint with database connectivity check."""
-    try:
-        # Quick database connectivity check
-        db.execute(text("SELECT 1"))
-        db_status = "ok"
-    except Exception:
-        db_status = "degraded"
-    
+    """Health check endpoint with database connectivity check.
+
+    The DB check is cached for a short TTL so frequent probes don't
+    translate into one query per probe per replica.
+    """
+    global _last_check
+
+    checked_at, db_status = _last_check
+    if time.monotonic() - checked_at >= _CHECK_TTL_SECONDS:
+        try:
+            # Quick database connectivity check
+            db.execute(text("SELECT 1"))
+            db_status = "ok"
+        except Exception:
+            db_status = "degraded"
+        _last_check = (time.monotonic(), db_status)
+
     return {
         "status": "ok" if db_status == "ok" else "degraded",
         "database": db_status,
         "time": datetime.now(timezone.utc).isoformat(),
     }
-
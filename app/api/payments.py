@@ -1,12 +1,15 @@
 """Payment endpoints."""
+import asyncio
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import redis
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session, joinedload
 
 from app.core.config import settings
-from app.core.rate_limit import limiter, get_client_rate_limit_key
+from app.core.rate_limit import payment_rate_limiter
 from app.db.session import get_db
 from app.db.models import (
     PaymentRequest,
@@ -15,16 +18,66 @@ from app.db.models import (
     Client,
 )
 from app.api.deps import get_current_client
+from app.db.ids import uuid7
 from app.schemas.payments import PaymentCreateRequest, PaymentResponse, InvoiceSchema, AmountSchema
-from app.services.btcpay import get_btcpay_client
-from app.services.notifications import publish_payment_event
-from app.worker.tasks import monitor_payment
+from app.services.btcpay import (
+    extract_amount_sats,
+    extract_bolt11,
+    get_async_btcpay_client,
+    parse_expires_at,
+)
+from app.services.notifications import (
+    apublish_payment_event,
+    build_sse_event,
+    payment_cache_key,
+    redis_client,
+)
+from app.worker.tasks import check_payment_timeout
 
 router = APIRouter()
 
+# Hot settings bound at import so request handlers skip Pydantic
+# attribute access on every call
+_MONITOR_SECONDS = settings.payment_monitor_seconds
+_STORE_ID = settings.btcpay_store_id
+
+# Kiosks poll GET /payments/{id} while a payment is pending; a short-TTL
+# Redis cache of the serialized response turns the idle-poll case into a
+# single GET instead of a Postgres round trip. Finalizing transitions
+# delete the key eagerly, so 500ms only bounds staleness for in-flight
+# polls that raced the invalidation.
+_STATUS_CACHE_TTL_MS = 500
 
-@router.post("/payments", response_model=PaymentResponse, status_code=status.HTTP_201_CREATED)
-def create_payment(
+# Precompiled lookups reused across requests; joinedload pulls the
+# one-to-one provider_invoice in the same query so building the response
+# doesn't trigger a lazy-load SELECT.
+# The idempotency probe selects only the id: the common case is a miss,
+# which then costs a single index-only scan with no row materialization.
+_PAYMENT_ID_BY_IDEMPOTENCY = (
+    select(PaymentRequest.id)
+    .where(
+        PaymentRequest.client_id == bindparam("client_id"),
+        PaymentRequest.idempotency_key == bindparam("idempotency_key"),
+    )
+    .limit(1)
+)
+_PAYMENT_BY_ID_FOR_CLIENT = (
+    select(PaymentRequest)
+    .options(joinedload(PaymentRequest.provider_invoice))
+    .where(
+        PaymentRequest.id == bindparam("payment_id"),
+        PaymentRequest.client_id == bindparam("client_id"),
+    )
+)
+
+
+@router.post(
+    "/payments",
+    response_model=PaymentResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(payment_rate_limiter)],
+)
+async def create_payment(
     request: PaymentCreateRequest,
     client_id: UUID = Depends(get_current_client),
     db: Session = Depends(get_db),
@@ -37,38 +90,49 @@ def create_payment(
             detail=f"Unsupported payment method: {request.payment_method}",
         )
     
-    # Check idempotency
+    # Check idempotency (hits the partial unique index on
+    # (client_id, idempotency_key) WHERE idempotency_key IS NOT NULL)
     if request.idempotency_key:
-        existing = db.query(PaymentRequest).filter(
-            PaymentRequest.client_id == client_id,
-            PaymentRequest.idempotency_key == request.idempotency_key,
-        ).first()
-        
-        if existing:
-            # Return existing payment
+        existing_id = db.execute(
+            _PAYMENT_ID_BY_IDEMPOTENCY,
+            {"client_id": client_id, "idempotency_key": request.idempotency_key},
+        ).scalar()
+
+        if existing_id:
+            # Hit: do the full fetch and return the existing payment
+            existing = db.execute(
+                _PAYMENT_BY_ID_FOR_CLIENT,
+                {"payment_id": existing_id, "client_id": client_id},
+            ).scalar_one()
             return _payment_to_response(existing, db)
     
+    # Convert the Pydantic URL fields once; they are reused several times
+    # below and str() on a pydantic URL is not free
+    callback_url_str = str(request.callback_url) if request.callback_url else None
+    redirect_url_str = str(request.redirect_url) if request.redirect_url else None
+
     # Calculate monitor_until timestamp (2 minutes from now)
-    monitor_until = datetime.now(timezone.utc) + timedelta(seconds=settings.payment_monitor_seconds)
+    monitor_until = datetime.now(timezone.utc) + timedelta(seconds=_MONITOR_SECONDS)
     
-    # Create payment request
+    # Create payment request. The UUID is generated here rather than at
+    # flush time so no extra roundtrip is needed just to learn payment.id.
     payment = PaymentRequest(
+        id=uuid7(),
         client_id=client_id,
         external_code=request.external_code,
         payment_method=request.payment_method,
         amount=request.amount,
         currency=request.currency,
         description=request.description,
-        callback_url=str(request.callback_url) if request.callback_url else None,
-        redirect_url=str(request.redirect_url) if request.redirect_url else None,
+        callback_url=callback_url_str,
+        redirect_url=redirect_url_str,
         payment_metadata=request.metadata or {},
         idempotency_key=request.idempotency_key,
         status=PaymentRequest.STATUS_CREATED,
         monitor_until=monitor_until,
     )
     db.add(payment)
-    db.flush()  # Get payment.id
-    
+
     # Log CREATED event
     _create_payment_event(
         db,
@@ -81,8 +145,8 @@ def create_payment(
     
     # Create BTCPay invoice
     try:
-        btcpay = get_btcpay_client()
-        btcpay_response = btcpay.create_invoice(
+        btcpay = get_async_btcpay_client()
+        btcpay_response = await btcpay.create_invoice(
             amount=float(request.amount),
             currency=request.currency,
             metadata={
@@ -90,7 +154,7 @@ def create_payment(
                 "external_code": request.external_code,
                 **request.metadata,
             },
-            redirect_url=str(request.redirect_url) if request.redirect_url else None,
+            redirect_url=redirect_url_str,
         )
         
         invoice_id = btcpay_response.get("id")
@@ -98,59 +162,54 @@ def create_payment(
             raise ValueError("BTCPay response missing invoice ID")
         
         checkout_link = btcpay_response.get("checkoutLink")
-        
-        # Extract BOLT11 - try multiple approaches
-        bolt11 = None
-        
-        # Method 1: Check availablePaymentMethods in create response
-        available_methods = btcpay_response.get("availablePaymentMethods", [])
-        if available_methods:
-            for method in available_methods:
-                method_name = method.get("paymentMethod") or method.get("paymentMethodId")
-                if method_name == "BTC-LightningNetwork":
-                    # BOLT11 is in paymentLink field (BTCPay Greenfield API)
-                    payment_link = method.get("paymentLink")
-                    if payment_link:
-                        # If it's a string starting with lnbc, it's the BOLT11
-                        if isinstance(payment_link, str) and payment_link.startswith("lnbc"):
-                            bolt11 = payment_link
-                            break
-                        # If it's a dict, check nested fields
-                        elif isinstance(payment_link, dict):
-                            bolt11 = payment_link.get("paymentLink") or payment_link.get("destination")
-                            if bolt11 and isinstance(bolt11, str) and bolt11.startswith("lnbc"):
-                                break
-                    # Also check destination field directly
-                    destination = method.get("destination")
-                    if destination and isinstance(destination, str) and destination.startswith("lnbc"):
-                        bolt11 = destination
-                        break
-        
-        # Method 2: Always fetch invoice details (BTCPay often doesn't include payment methods in create response)
-        # The create response might not have availablePaymentMethods populated immediately
-        import time
-        
-        if not bolt11:
-            # Fetch invoice details - BTCPay generates payment methods asynchronously
-            time.sleep(0.5)  # Small delay for BTCPay to generate Lightning invoice
-            bolt11 = btcpay.get_bolt11(invoice_id)
-        
-        # If still not found, try one more time after longer delay
+
+        # Check the create response for an already-populated Lightning
+        # method (rare - BTCPay usually generates payment methods
+        # asynchronously), then fall back to polling the payment-methods
+        # endpoint. The method payload yields both the BOLT11 and the
+        # sats amount, so one poll covers both.
+        ln_method = None
+        for method in btcpay_response.get("availablePaymentMethods") or ():
+            method_name = method.get("paymentMethod") or method.get("paymentMethodId")
+            if method_name in ("BTC-LN", "BTC-LightningNetwork"):
+                ln_method = method
+                break
+
+        # Poll with exponential backoff (BTCPay generates payment methods
+        # asynchronously, so the create response often doesn't include
+        # them yet). awaiting the sleeps yields the event loop to other
+        # requests, and backoff keeps the common case (invoice ready
+        # within ~100-300 ms) fast.
+        bolt11 = extract_bolt11(ln_method)
         if not bolt11:
-            time.sleep(1.0)
-            bolt11 = btcpay.get_bolt11(invoice_id)
-        
-        if not checkout_link:
-            checkout_link = btcpay.get_checkout_link(invoice_id)
-        
-        expires_at = btcpay.get_expires_at(invoice_id)
+            for delay in (0.1, 0.2, 0.4, 0.8):
+                await asyncio.sleep(delay)
+                ln_method = await btcpay.get_lightning_payment_method(invoice_id)
+                bolt11 = extract_bolt11(ln_method)
+                if bolt11:
+                    break
+
+        # Record the integer sats amount alongside the fiat amount; clients
+        # displaying Lightning prices read this without Decimal conversions
+        payment.amount_sats = extract_amount_sats(ln_method)
+
+        # The create response usually already carries checkoutLink and
+        # expirationTime; only if either is missing do we fetch the
+        # invoice once and fill in both, instead of one roundtrip each.
+        expires_at = parse_expires_at(btcpay_response)
+        if not checkout_link or expires_at is None:
+            invoice_details = await btcpay.get_invoice(invoice_id)
+            if not checkout_link:
+                checkout_link = invoice_details.get("checkoutLink")
+            if expires_at is None:
+                expires_at = parse_expires_at(invoice_details)
         
         # Create provider invoice record
         provider_invoice = ProviderInvoice(
             payment_request_id=payment.id,
             provider=ProviderInvoice.PROVIDER_BTCPAY,
             provider_invoice_id=invoice_id,
-            store_id=settings.btcpay_store_id,
+            store_id=_STORE_ID,
             checkout_link=checkout_link,
             bolt11=bolt11,
             expires_at=expires_at,
@@ -162,7 +221,7 @@ def create_payment(
         payment.status = PaymentRequest.STATUS_PENDING
         
         # Log PROVIDER_INVOICE_CREATED event
-        _create_payment_event(
+        event = _create_payment_event(
             db,
             payment.id,
             PaymentEvent.EVENT_PROVIDER_INVOICE_CREATED,
@@ -171,14 +230,20 @@ def create_payment(
             PaymentEvent.SOURCE_API,
             payload={"provider_invoice_id": invoice_id},
         )
-        
+        db.flush()  # Assign seq so the SSE payload can be serialized
+
+        # Serialize the SSE payload once at write time; it is stored for
+        # replay and published for live streaming
+        sse_event, sse_payload = build_sse_event(event)
+        event.sse_payload = sse_payload
+
         db.commit()
+
+        await apublish_payment_event(str(client_id), str(payment.id), event.seq, sse_event, sse_payload)
         
-        # Publish notification for SSE
-        publish_payment_event(str(client_id), str(payment.id), payment.events[-1].seq)
-        
-        # Enqueue monitoring task
-        monitor_payment.delay(str(payment.id))
+        # Schedule the deadline check; the broker holds the ETA so no
+        # worker slot is tied up while the payment is pending
+        check_payment_timeout.apply_async(args=[str(payment.id)], eta=monitor_until)
         
         return _payment_to_response(payment, db)
         
@@ -224,18 +289,35 @@ def get_payment(
     db: Session = Depends(get_db),
 ):
     """Get payment status by ID."""
-    payment = db.query(PaymentRequest).filter(
-        PaymentRequest.id == payment_id,
-        PaymentRequest.client_id == client_id,
-    ).first()
-    
+    # Cache is best-effort throughout: Redis being down just means every
+    # poll falls through to Postgres, same as before the cache existed
+    cache_key = payment_cache_key(str(client_id), str(payment_id))
+    try:
+        cached = redis_client.get(cache_key)
+    except redis.RedisError:
+        cached = None
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    payment = db.execute(
+        _PAYMENT_BY_ID_FOR_CLIENT,
+        {"payment_id": payment_id, "client_id": client_id},
+    ).scalar_one_or_none()
+
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Payment not found",
         )
-    
-    return _payment_to_response(payment, db)
+
+    response = _payment_to_response(payment, db)
+    try:
+        redis_client.set(
+            cache_key, response.model_dump_json(), px=_STATUS_CACHE_TTL_MS
+        )
+    except redis.RedisError:
+        pass
+    return response
 
 
 def _payment_to_response(payment: PaymentRequest, db: Session) -> PaymentResponse:
@@ -271,6 +353,7 @@ def _payment_to_response(payment: PaymentRequest, db: Session) -> PaymentRespons
         amount=AmountSchema(
             amount=payment.amount,
             currency=payment.currency,
+            amount_sats=payment.amount_sats,
         ),
         metadata=payment.payment_metadata,
         external_code=payment.external_code,
@@ -290,7 +373,12 @@ def _create_payment_event(
     source: str,
     payload: Optional[dict] = None,
 ):
-    """Helper to create payment event."""
+    """Helper to create payment event.
+
+    Only stages the event; callers that need the assigned seq (e.g. to
+    serialize the SSE payload) flush explicitly, everyone else rides the
+    next commit.
+    """
     event = PaymentEvent(
         payment_request_id=payment_id,
         event_type=event_type,
@@ -300,6 +388,5 @@ def _create_payment_event(
         payload=payload or {},
     )
     db.add(event)
-    db.flush()  # Get seq number
     return event
 
@@ -1,6 +1,8 @@
 """Webhook endpoints for external services."""
+import orjson
 from fastapi import APIRouter, Request, HTTPException, status, Header, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional
 from datetime import datetime, timezone
 
@@ -12,10 +14,29 @@ from app.db.models import (
     ProviderInvoice,
     PaymentEvent,
 )
-from app.services.notifications import publish_payment_event, send_callback
+from app.services.notifications import (
+    ainvalidate_payment_cache,
+    apublish_payment_event,
+    build_sse_event,
+)
+from app.services.webhook_batcher import webhook_batcher
+from app.worker.tasks import send_callback_task
 
 router = APIRouter()
 
+# Precompiled lookup reused across webhook deliveries; provider_invoice_id
+# is unique so scalar_one_or_none needs no LIMIT. The handler always walks
+# invoice -> payment (and build_sse_event walks back to the invoice), so
+# eager-join both hops into the one query instead of two lazy SELECTs.
+_INVOICE_BY_PROVIDER_ID = (
+    select(ProviderInvoice)
+    .options(
+        joinedload(ProviderInvoice.payment_request)
+        .joinedload(PaymentRequest.provider_invoice)
+    )
+    .where(ProviderInvoice.provider_invoice_id == bindparam("provider_invoice_id"))
+)
+
 
 @router.post("/webhooks/btcpay")
 async def btcpay_webhook(
@@ -55,9 +76,10 @@ async def btcpay_webhook(
             detail="Invalid signature",
         )
     
-    # Parse webhook payload
+    # Parse webhook payload (from the body already read for the signature
+    # check; BTCPay embeds the full invoice, so payloads run multi-KB)
     try:
-        payload = await request.json()
+        payload = orjson.loads(body)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -75,9 +97,9 @@ async def btcpay_webhook(
         )
     
     # Find provider invoice
-    provider_invoice = db.query(ProviderInvoice).filter(
-        ProviderInvoice.provider_invoice_id == invoice_id,
-    ).first()
+    provider_invoice = db.execute(
+        _INVOICE_BY_PROVIDER_ID, {"provider_invoice_id": invoice_id}
+    ).scalar_one_or_none()
     
     if not provider_invoice:
         # Invoice not found - might be for another store or test webhook
@@ -114,21 +136,28 @@ async def btcpay_webhook(
                 payload=payload,
             )
             db.add(event)
+            db.flush()  # Assign seq so the SSE payload can be serialized
+            sse_event, sse_payload = build_sse_event(event)
+            event.sse_payload = sse_payload
+            # Status update, raw_last_status and event land in one commit
             db.commit()
-            
-            # Publish notification
-            publish_payment_event(str(payment.client_id), str(payment.id), event.seq)
-            
-            # Send callback if configured
+
+            await apublish_payment_event(str(payment.client_id), str(payment.id), event.seq, sse_event, sse_payload)
+            # Drop the cached poll response so the next status GET sees
+            # the terminal state immediately
+            await ainvalidate_payment_cache(str(payment.client_id), str(payment.id))
+
+            # Enqueue callback if configured; delivery (and its retries)
+            # happens in the worker so the webhook response isn't blocked
+            # on the merchant's endpoint
             if payment.callback_url:
-                import asyncio
-                asyncio.run(send_callback(
+                send_callback_task.delay(
                     payment.callback_url,
-                    payment.id,
+                    str(payment.id),
                     PaymentRequest.STATUS_PAID,
-                    now,
-                ))
-            
+                    now.isoformat(),
+                )
+
             return {"status": "processed", "payment_id": str(payment.id)}
     
     elif event_type in ("InvoiceExpired", "invoice.expired"):
@@ -150,24 +179,27 @@ async def btcpay_webhook(
                 payload=payload,
             )
             db.add(event)
+            db.flush()  # Assign seq so the SSE payload can be serialized
+            sse_event, sse_payload = build_sse_event(event)
+            event.sse_payload = sse_payload
             db.commit()
-            
-            # Publish notification
-            publish_payment_event(str(payment.client_id), str(payment.id), event.seq)
-            
+
+            await apublish_payment_event(str(payment.client_id), str(payment.id), event.seq, sse_event, sse_payload)
+            await ainvalidate_payment_cache(str(payment.client_id), str(payment.id))
+
             return {"status": "processed", "payment_id": str(payment.id)}
         else:
-            # Still within monitor window, just log the event
-            event = PaymentEvent(
+            # Still within monitor window: no status change, so the event
+            # is mergeable and goes through the micro-batcher, sharing a
+            # commit with other informational deliveries
+            await webhook_batcher.submit(dict(
                 payment_request_id=payment.id,
                 event_type=PaymentEvent.EVENT_WEBHOOK_RECEIVED,
                 old_status=payment.status,
                 new_status=payment.status,
                 source=PaymentEvent.SOURCE_BTCPAY_WEBHOOK,
                 payload=payload,
-            )
-            db.add(event)
-            db.commit()
+            ))
             return {"status": "logged", "payment_id": str(payment.id)}
     
     elif event_type in ("InvoiceInvalid", "invoice.invalid", "InvoiceFailed", "invoice.failed"):
@@ -187,24 +219,25 @@ async def btcpay_webhook(
             payload=payload,
         )
         db.add(event)
+        db.flush()  # Assign seq so the SSE payload can be serialized
+        sse_event, sse_payload = build_sse_event(event)
+        event.sse_payload = sse_payload
         db.commit()
-        
-        # Publish notification
-        publish_payment_event(str(payment.client_id), str(payment.id), event.seq)
-        
+
+        await apublish_payment_event(str(payment.client_id), str(payment.id), event.seq, sse_event, sse_payload)
+        await ainvalidate_payment_cache(str(payment.client_id), str(payment.id))
+
         return {"status": "processed", "payment_id": str(payment.id)}
     
     else:
-        # Unknown event type - just log it
-        event = PaymentEvent(
+        # Unknown event type - just log it (batched; no status change)
+        await webhook_batcher.submit(dict(
             payment_request_id=payment.id,
             event_type=PaymentEvent.EVENT_WEBHOOK_RECEIVED,
             old_status=payment.status,
             new_status=payment.status,
             source=PaymentEvent.SOURCE_BTCPAY_WEBHOOK,
             payload=payload,
-        )
-        db.add(event)
-        db.commit()
+        ))
         return {"status": "logged", "payment_id": str(payment.id), "event_type": event_type}
 
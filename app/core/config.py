@@ -14,10 +14,17 @@ class Settings(BaseSettings):
         env_file_encoding="utf-8",
         case_sensitive=False,
         extra="ignore",
+        # Settings are read-only after startup; frozen models also skip
+        # Pydantic's mutation checks on attribute access
+        frozen=True,
     )
 
     # Database
     database_url: str = Field(..., description="PostgreSQL connection string")
+    database_pool_size: int = Field(default=20, description="SQLAlchemy connection pool size")
+    database_pool_overflow: int = Field(default=30, description="Connections allowed beyond pool_size")
+    database_pool_timeout: int = Field(default=10, description="Seconds to wait for a pooled connection")
+    database_pool_recycle: int = Field(default=1800, description="Recycle pooled connections after this many seconds")
 
     # Redis
     redis_url: str = Field(..., description="Redis connection string")
@@ -25,7 +32,9 @@ class Settings(BaseSettings):
     # JWT Configuration
     jwt_private_key_path: str = Field(default="./jwt_private.pem", description="Path to JWT private key")
     jwt_public_key_path: str = Field(default="./jwt_public.pem", description="Path to JWT public key")
-    jwt_algorithm: str = Field(default="RS256", description="JWT signing algorithm")
+    # EdDSA (Ed25519) verifies ~2-3x faster than RS256 and yields 64-byte
+    # signatures; set JWT_ALGORITHM=RS256 for legacy RSA key files
+    jwt_algorithm: str = Field(default="EdDSA", description="JWT signing algorithm")
     jwt_expire_minutes: int = Field(default=10, description="JWT expiration time in minutes")
 
     # BTCPay Server
@@ -43,6 +52,13 @@ class Settings(BaseSettings):
     api_port: int = Field(default=8000, description="API server port")
     log_level: str = Field(default="INFO", description="Logging level")
 
+    # Password Hashing (Argon2id). Defaults follow current OWASP minimums;
+    # parallelism stays at 1 because lanes don't buy anything inside a
+    # single CPython process.
+    argon2_time_cost: int = Field(default=3, description="Argon2 iterations")
+    argon2_memory_cost_kib: int = Field(default=19456, description="Argon2 memory cost in KiB")
+    argon2_parallelism: int = Field(default=1, description="Argon2 parallelism lanes")
+
     # Rate Limiting
     rate_limit_auth_per_minute: int = Field(default=5, description="Auth endpoint rate limit per minute")
     rate_limit_payments_per_minute: int = Field(default=60, description="Payments endpoint rate limit per minute")
@@ -1,41 +1,71 @@
-"""Rate limiting using slowapi and Redis."""
-from typing import Optional
-from fastapi import Request
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+"""Redis token-bucket rate limiting."""
+import time
+from typing import Callable
+
+from fastapi import HTTPException, Request, status
 import redis
+import redis.asyncio as aioredis
 
 from app.core.config import settings
 
-# Initialize Redis client for rate limiting
-redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+# Sync Redis client kept for non-request-path users. An explicit connection
+# pool bounds the number of sockets, and with hiredis installed redis-py
+# picks its C reply parser automatically.
+_redis_pool = redis.ConnectionPool.from_url(
+    settings.redis_url, max_connections=64, decode_responses=True
+)
+redis_client = redis.Redis(connection_pool=_redis_pool)
 
-# Initialize limiter
-limiter = Limiter(
-    key_func=get_remote_address,
-    storage_uri=settings.redis_url,
-    default_limits=["1000/hour"],
+# Async client for the request path: one EVALSHA round-trip per request,
+# awaited so the event loop is never blocked on Redis
+_aredis = aioredis.from_url(
+    settings.redis_url, decode_responses=True, max_connections=64
 )
 
+# Atomic token bucket. One script invocation refills by elapsed time,
+# takes a token if available, and returns (allowed, retry_after_seconds)
+# - no INCR+EXPIRE pair, no race window between read and write.
+_TOKEN_BUCKET_LUA = """
+local key = KEYS[1]
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', key, math.ceil(capacity / rate) * 2)
+if allowed == 1 then
+  return {1, 0}
+end
+return {0, math.ceil((1 - tokens) / rate)}
+"""
+
+_token_bucket = _aredis.register_script(_TOKEN_BUCKET_LUA)
 
-def get_machine_id_from_request(request: Request) -> Optional[str]:
-    """Extract machine_id from request body for rate limiting."""
-    # This is a fallback; actual rate limiting will use IP + machine_id combo
-    # For auth endpoint, we'll use a custom key function
-    return None
+
+def get_remote_address(request: Request) -> str:
+    """Best-effort caller IP for rate-limit keying."""
+    return request.client.host if request.client else "unknown"
 
 
 def get_auth_rate_limit_key(request: Request) -> str:
-    """Custom key function for auth endpoint: IP + machine_id."""
-    ip = get_remote_address(request)
-    # Try to get machine_id from request body (if available)
-    # For now, just use IP
-    return f"auth:{ip}"
+    """Key function for the auth endpoint: per caller IP."""
+    return f"auth:{get_remote_address(request)}"
 
 
 def get_client_rate_limit_key(request: Request) -> str:
-    """Custom key function for payment endpoints: client_id from JWT."""
+    """Key function for payment endpoints: client_id from JWT."""
     # This will be set in the dependency after JWT verification
     client_id = getattr(request.state, "client_id", None)
     if client_id:
@@ -43,3 +73,42 @@ def get_client_rate_limit_key(request: Request) -> str:
     # Fallback to IP if no client_id
     return f"payments:{get_remote_address(request)}"
 
+
+class RateLimiter:
+    """FastAPI dependency enforcing a token-bucket limit per key.
+
+    Bucket capacity equals the per-minute budget, refilled continuously,
+    so short bursts up to the budget pass and sustained traffic is held
+    to the configured rate.
+    """
+
+    def __init__(self, per_minute: int, key_func: Callable[[Request], str]):
+        self._rate = per_minute / 60.0
+        self._capacity = per_minute
+        self._key_func = key_func
+
+    async def __call__(self, request: Request) -> None:
+        key = f"ratelimit:{self._key_func(request)}"
+        try:
+            allowed, retry_after = await _token_bucket(
+                keys=[key], args=[self._rate, self._capacity, time.time()]
+            )
+        except redis.RedisError:
+            # Fail open: rate limiting protects capacity, it is not an
+            # auth boundary, and Redis being down shouldn't take payments
+            # down with it
+            return
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+
+auth_rate_limiter = RateLimiter(
+    settings.rate_limit_auth_per_minute, get_auth_rate_limit_key
+)
+payment_rate_limiter = RateLimiter(
+    settings.rate_limit_payments_per_minute, get_client_rate_limit_key
+)
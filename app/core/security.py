@@ -2,21 +2,74 @@
 import hmac
 import hashlib
 import secrets
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 import uuid
 
 import jwt
+from cachetools import TTLCache
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
+from cryptography.hazmat.primitives import serialization
 
 from app.core.config import settings
 
-# Initialize password hasher with strong parameters
+# Hot settings bound at import so token operations skip Pydantic
+# attribute access per call
+_JWT_ALGORITHM = settings.jwt_algorithm
+_JWT_EXPIRE_MINUTES = settings.jwt_expire_minutes
+
+# JWT keys are loaded from disk and PEM-parsed once, then reused. Passing
+# the parsed key objects to PyJWT skips the per-call PEM parse; verify_token
+# runs on every authenticated request, so this is on the hot path.
+_key_lock = threading.Lock()
+_jwt_private_key = None
+_jwt_public_key = None
+
+
+def _get_jwt_private_key():
+    """Parsed JWT private key, loaded lazily and cached for the process."""
+    global _jwt_private_key
+    if _jwt_private_key is None:
+        with _key_lock:
+            if _jwt_private_key is None:
+                _jwt_private_key = serialization.load_pem_private_key(
+                    settings.load_jwt_private_key().encode("utf-8"),
+                    password=None,
+                )
+    return _jwt_private_key
+
+
+def _get_jwt_public_key():
+    """Parsed JWT public key, loaded lazily and cached for the process."""
+    global _jwt_public_key
+    if _jwt_public_key is None:
+        with _key_lock:
+            if _jwt_public_key is None:
+                _jwt_public_key = serialization.load_pem_public_key(
+                    settings.load_jwt_public_key().encode("utf-8"),
+                )
+    return _jwt_public_key
+
+
+def reload_keys() -> None:
+    """Drop the cached JWT keys so the next token operation re-reads them.
+
+    Call after rotating the key files on disk.
+    """
+    global _jwt_private_key, _jwt_public_key
+    with _key_lock:
+        _jwt_private_key = None
+        _jwt_public_key = None
+
+# Initialize password hasher from settings so ops can tune cost vs. the
+# memory each concurrent login allocates (memory_cost KiB per verify)
 password_hasher = PasswordHasher(
-    time_cost=3,  # Number of iterations
-    memory_cost=65536,  # 64 MB
-    parallelism=4,  # Number of parallel threads
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost_kib,
+    parallelism=settings.argon2_parallelism,
     hash_len=32,
     salt_len=16,
 )
@@ -36,10 +89,15 @@ def verify_password(password: str, password_hash: str) -> bool:
         return False
 
 
+def password_needs_rehash(password_hash: str) -> bool:
+    """Whether the hash was created with outdated Argon2 parameters."""
+    return password_hasher.check_needs_rehash(password_hash)
+
+
 def create_access_token(client_id: str, machine_id: str, scope: str = "payments:create payments:read") -> str:
     """Create a JWT access token."""
     now = datetime.now(timezone.utc)
-    expire = now + timedelta(minutes=settings.jwt_expire_minutes)
+    expire = now + timedelta(minutes=_JWT_EXPIRE_MINUTES)
     
     payload = {
         "sub": str(client_id),  # Subject (client UUID)
@@ -50,21 +108,43 @@ def create_access_token(client_id: str, machine_id: str, scope: str = "payments:
         "scope": scope,
     }
     
-    private_key = settings.load_jwt_private_key()
-    token = jwt.encode(payload, private_key, algorithm=settings.jwt_algorithm)
+    token = jwt.encode(payload, _get_jwt_private_key(), algorithm=_JWT_ALGORITHM)
     return token
 
 
+# Verified token claims keyed by a blake2b hash of the token (avoids
+# holding raw JWTs as dict keys). RSA verification costs ~100 µs of CPU
+# per call and tokens are reused for their 10-minute lifetime, so repeat
+# verifies are nearly all cache hits. Expiry is still enforced on hit.
+# TTLCache is not thread-safe and verify_token runs in the threadpool,
+# so each access holds a lock (as _key_lock does for the JWT keys); the
+# RSA verify itself stays outside the critical section.
+_token_claims_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_claims_cache_lock = threading.Lock()
+
+
 def verify_token(token: str) -> Optional[dict]:
     """Verify and decode a JWT token."""
+    cache_key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+    with _claims_cache_lock:
+        payload = _token_claims_cache.get(cache_key)
+    if payload is not None:
+        if payload["exp"] > time.time():
+            return payload
+        with _claims_cache_lock:
+            _token_claims_cache.pop(cache_key, None)
+        return None
+
     try:
-        public_key = settings.load_jwt_public_key()
         payload = jwt.decode(
             token,
-            public_key,
-            algorithms=[settings.jwt_algorithm],
+            _get_jwt_public_key(),
+            algorithms=[_JWT_ALGORITHM],
             options={"verify_exp": True},
         )
+        with _claims_cache_lock:
+            _token_claims_cache[cache_key] = payload
         return payload
     except jwt.ExpiredSignatureError:
         return None
@@ -72,23 +152,37 @@ def verify_token(token: str) -> Optional[dict]:
         return None
 
 
+# HMAC templates keyed by secret. hmac.new() runs the SHA-256 key schedule
+# on every call; .copy() of a prepared template skips both that and the
+# per-call UTF-8 encode of the secret. The dict only ever holds a couple of
+# entries (the webhook secret, plus test secrets).
+_mac_templates: dict = {}
+
+
+def _mac_for_secret(secret: str) -> "hmac.HMAC":
+    template = _mac_templates.get(secret)
+    if template is None:
+        template = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+        _mac_templates[secret] = template
+    return template.copy()
+
+
 def verify_hmac_signature(payload: bytes, signature: str, secret: str) -> bool:
     """Verify HMAC signature using constant-time comparison."""
-    expected_signature = hmac.new(
-        secret.encode("utf-8"),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
-    
-    # Constant-time comparison to prevent timing attacks
-    return hmac.compare_digest(expected_signature, signature)
+    mac = _mac_for_secret(secret)
+    mac.update(payload)
+
+    # Compare as raw digests (half the length of hex) in constant time
+    try:
+        given = bytes.fromhex(signature)
+    except ValueError:
+        return False
+    return hmac.compare_digest(mac.digest(), given)
 
 
 def generate_hmac_signature(payload: bytes, secret: str) -> str:
     """Generate HMAC signature for payload."""
-    return hmac.new(
-        secret.encode("utf-8"),
-        payload,
-        hashlib.sha256
-    ).hexdigest()
+    mac = _mac_for_secret(secret)
+    mac.update(payload)
+    return mac.hexdigest()
 
@@ -0,0 +1,49 @@
+"""Helpers shared by Alembic migrations."""
+from typing import Optional
+
+from alembic import op
+
+
+def create_index_concurrently(
+    name: str,
+    table: str,
+    columns: str,
+    unique: bool = False,
+    using: Optional[str] = None,
+    include: Optional[str] = None,
+    where: Optional[str] = None,
+) -> None:
+    """Create an index using CREATE INDEX CONCURRENTLY.
+
+    A plain CREATE INDEX takes a lock that blocks writes for the duration of
+    the build - fine on an empty table, a production outage on a large one.
+    CONCURRENTLY builds without blocking writes but cannot run inside the
+    migration transaction, so this wraps the statement in an autocommit
+    block. Use this for any index added to payment_requests/payment_events
+    after they have accumulated data.
+
+    Args:
+        name: Index name
+        table: Table to index
+        columns: Column list (including any per-column opclass)
+        unique: Build a UNIQUE index
+        using: Access method (e.g. "gin") instead of the btree default
+        include: INCLUDE column list for covering indexes
+        where: Predicate for partial indexes
+    """
+    sql = f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table}"
+    if using:
+        sql += f" USING {using}"
+    sql += f" ({columns})"
+    if include:
+        sql += f" INCLUDE ({include})"
+    if where:
+        sql += f" WHERE {where}"
+    with op.get_context().autocommit_block():
+        op.execute(sql)
+
+
+def drop_index_concurrently(name: str) -> None:
+    """Drop an index using DROP INDEX CONCURRENTLY (outside the migration tx)."""
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -1,6 +1,6 @@
 """SQLAlchemy database models."""
-import uuid
 from datetime import datetime, timezone
+from ipaddress import ip_network
 from typing import Optional
 
 from sqlalchemy import (
@@ -12,16 +12,15 @@ from sqlalchemy import (
     BigInteger,
     Text,
     ForeignKey,
-    UniqueConstraint,
     Index,
-    JSON,
     ARRAY,
     Sequence,
 )
-from sqlalchemy.dialects.postgresql import UUID, INET, CIDR
+from sqlalchemy.dialects.postgresql import UUID, INET, CIDR, JSONB
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 
+from app.db.ids import uuid7
 from app.db.session import Base
 
 
@@ -30,7 +29,7 @@ class Client(Base):
 
     __tablename__ = "clients"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     machine_id = Column(String(255), unique=True, nullable=False, index=True)
     password_hash = Column(Text, nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
@@ -38,12 +37,25 @@ class Client(Base):
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
     last_seen_at = Column(DateTime(timezone=True), nullable=True)
-    client_metadata = Column(JSON, nullable=True, default=dict)
+    client_metadata = Column(JSONB, nullable=True, default=dict)
 
     # Relationships
     payment_requests = relationship("PaymentRequest", back_populates="client", cascade="all, delete-orphan")
     auth_events = relationship("ClientAuthEvent", back_populates="client", cascade="all, delete-orphan")
 
+    @property
+    def allowed_networks(self) -> tuple:
+        """Parsed `allowed_ips` CIDRs, cached per instance.
+
+        The DB driver may return CIDRs as strings; parse them once so
+        repeated logins from the same client skip re-parsing.
+        """
+        networks = getattr(self, "_allowed_networks", None)
+        if networks is None:
+            networks = tuple(ip_network(str(cidr)) for cidr in (self.allowed_ips or ()))
+            self._allowed_networks = networks
+        return networks
+
     def __repr__(self):
         return f"<Client(id={self.id}, machine_id={self.machine_id})>"
 
@@ -53,13 +65,13 @@ class ClientAuthEvent(Base):
 
     __tablename__ = "client_auth_events"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     client_id = Column(UUID(as_uuid=True), ForeignKey("clients.id"), nullable=False, index=True)
     event_type = Column(String(50), nullable=False)  # LOGIN_OK, LOGIN_FAIL, TOKEN_ISSUED, TOKEN_REVOKED
     ip = Column(INET, nullable=True)
     user_agent = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
-    details = Column(JSON, nullable=True, default=dict)
+    details = Column(JSONB, nullable=True, default=dict)
 
     # Relationships
     client = relationship("Client", back_populates="auth_events")
@@ -82,8 +94,9 @@ class PaymentRequest(Base):
     STATUS_FAILED = "FAILED"
     STATUS_CANCELED = "CANCELED"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    client_id = Column(UUID(as_uuid=True), ForeignKey("clients.id"), nullable=False, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    # Covered by the leftmost prefix of idx_payment_client_created
+    client_id = Column(UUID(as_uuid=True), ForeignKey("clients.id"), nullable=False)
     external_code = Column(String(64), nullable=False)  # Merchant order ID
     payment_method = Column(String(50), nullable=False)  # BTC_LN, USDT_TRC20, etc.
     amount = Column(Numeric(18, 8), nullable=False)
@@ -92,7 +105,7 @@ class PaymentRequest(Base):
     description = Column(Text, nullable=True)
     callback_url = Column(Text, nullable=True)
     redirect_url = Column(Text, nullable=True)
-    payment_metadata = Column(JSON, nullable=False, default=dict)
+    payment_metadata = Column(JSONB, nullable=False, default=dict)
     idempotency_key = Column(String(255), nullable=True)
     status = Column(String(50), nullable=False, default=STATUS_CREATED, index=True)
     status_reason = Column(Text, nullable=True)
@@ -108,9 +121,30 @@ class PaymentRequest(Base):
 
     # Constraints
     __table_args__ = (
-        UniqueConstraint("client_id", "idempotency_key", name="uq_client_idempotency"),
+        # Partial unique index: only rows that actually carry an idempotency
+        # key are indexed, which is a small fraction of all payments
+        Index(
+            "uq_client_idempotency",
+            "client_id",
+            "idempotency_key",
+            unique=True,
+            postgresql_where=text("idempotency_key IS NOT NULL"),
+        ),
         Index("idx_payment_client_created", "client_id", "created_at"),
-        Index("idx_payment_status_monitor", "status", "monitor_until"),
+        # Partial index: the monitor worker only scans non-terminal payments,
+        # so skip the ever-growing set of finalized rows
+        Index(
+            "idx_payment_active_monitor",
+            "monitor_until",
+            postgresql_where=text("status IN ('CREATED', 'PENDING')"),
+        ),
+        # GIN index for containment queries on metadata (@> lookups)
+        Index(
+            "idx_payment_metadata_gin",
+            "payment_metadata",
+            postgresql_using="gin",
+            postgresql_ops={"payment_metadata": "jsonb_path_ops"},
+        ),
     )
 
     def __repr__(self):
@@ -124,16 +158,17 @@ class ProviderInvoice(Base):
 
     PROVIDER_BTCPAY = "BTCPAY"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     payment_request_id = Column(UUID(as_uuid=True), ForeignKey("payment_requests.id"), nullable=False, unique=True, index=True)
     provider = Column(String(50), nullable=False)  # BTCPAY
-    provider_invoice_id = Column(String(255), nullable=False, index=True)
+    # Unique: every BTCPay webhook resolves the payment through this column
+    provider_invoice_id = Column(String(255), nullable=False, unique=True, index=True)
     store_id = Column(String(255), nullable=False)
     checkout_link = Column(Text, nullable=True)
     bolt11 = Column(Text, nullable=True)  # Lightning invoice string
     expires_at = Column(DateTime(timezone=True), nullable=True)
-    raw_create_response = Column(JSON, nullable=False)
-    raw_last_status = Column(JSON, nullable=True)
+    raw_create_response = Column(JSONB, nullable=False)
+    raw_last_status = Column(JSONB, nullable=True)
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
 
@@ -164,23 +199,33 @@ class PaymentEvent(Base):
     SOURCE_WORKER = "WORKER"
     SOURCE_BTCPAY_WEBHOOK = "BTCPAY_WEBHOOK"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    seq = Column(BigInteger, Sequence("payment_events_seq"), nullable=False, unique=True, index=True)  # Monotonic sequence for SSE replay
-    payment_request_id = Column(UUID(as_uuid=True), ForeignKey("payment_requests.id"), nullable=False, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    # Monotonic sequence for SSE replay; the unique constraint's index
+    # already serves equality and range scans on seq
+    seq = Column(BigInteger, Sequence("payment_events_seq"), nullable=False, unique=True)
+    # Covered by the leftmost prefix of idx_payment_events_payment_seq
+    payment_request_id = Column(UUID(as_uuid=True), ForeignKey("payment_requests.id"), nullable=False)
     event_type = Column(String(50), nullable=False)
     old_status = Column(String(50), nullable=True)
     new_status = Column(String(50), nullable=True)
     source = Column(String(50), nullable=False)  # API, WORKER, BTCPAY_WEBHOOK
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
-    payload = Column(JSON, nullable=True, default=dict)
+    payload = Column(JSONB, nullable=True, default=dict)
+    sse_payload = Column(Text, nullable=True)  # Pre-serialized SSEEventData JSON for SSE replay
 
     # Relationships
     payment_request = relationship("PaymentRequest", back_populates="events")
 
     # Indexes for efficient SSE replay
     __table_args__ = (
-        Index("idx_payment_events_seq", "seq"),
-        Index("idx_payment_events_payment_seq", "payment_request_id", "seq"),
+        # Covering index: replay scans return event_type/created_at straight
+        # from the index without a heap fetch per row
+        Index(
+            "idx_payment_events_replay",
+            "payment_request_id",
+            "seq",
+            postgresql_include=["event_type", "created_at"],
+        ),
     )
 
     def __repr__(self):
@@ -16,13 +16,28 @@ def get_engine():
     global _engine
     if _engine is None:
         from app.core.config import settings
-        _engine = create_engine(
-            settings.database_url,
+        engine_kwargs = dict(
             pool_pre_ping=True,
-            pool_size=10,
-            max_overflow=20,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_pool_overflow,
+            pool_timeout=settings.database_pool_timeout,
+            pool_recycle=settings.database_pool_recycle,
+            # LIFO checkout reuses the most recently returned connection,
+            # keeping the corresponding PG backends warm
+            pool_use_lifo=True,
             echo=False,  # Set to True for SQL debugging
         )
+        if settings.database_url.startswith("postgresql"):
+            # Page multi-row inserts into VALUES (...), (...) batches so
+            # executemany costs one round-trip per page, not per row.
+            # psycopg2-only kwargs, so applied per-dialect: tests point
+            # database_url at SQLite, which rejects them.
+            engine_kwargs.update(
+                executemany_mode="values_plus_batch",
+                executemany_batch_page_size=500,
+                insertmanyvalues_page_size=1000,
+            )
+        _engine = create_engine(settings.database_url, **engine_kwargs)
     return _engine
 
 
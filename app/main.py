@@ -1,25 +1,72 @@
 """FastAPI application entry point."""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from slowapi.util import get_remote_address
+from fastapi.responses import ORJSONResponse
 
 from app.core.config import settings
-from app.core.rate_limit import limiter
 from app.api import health, auth, payments, events, webhooks
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prewarm shared pools on startup, tear them down on shutdown.
+
+    Without this, lazy init means the first payment request pays for the
+    DB pool spin-up, the Redis connection, and the BTCPay TLS handshake.
+    Warmups are best-effort: a dependency that's briefly down shouldn't
+    keep the API from booting (it would fail the affected requests anyway).
+    """
+    from app.db.session import get_engine
+    from app.services.btcpay import get_async_btcpay_client
+    from app.services.notifications import aredis_client
+    from app.services.webhook_batcher import webhook_batcher
+    from sqlalchemy import text
+
+    webhook_batcher.start()
+
+    def _warm_db():
+        with get_engine().connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.to_thread(_warm_db)
+    except Exception as e:
+        logger.warning("DB pool warmup failed: %s", e)
+
+    try:
+        await aredis_client.ping()
+    except Exception as e:
+        logger.warning("Redis warmup failed: %s", e)
+
+    btcpay = get_async_btcpay_client()
+    try:
+        # Opens the keep-alive connection (and TLS session) BTCPay calls reuse
+        await btcpay.client.get("/api/v1/health")
+    except Exception as e:
+        logger.warning("BTCPay warmup failed: %s", e)
+
+    yield
+
+    await webhook_batcher.stop()
+    await btcpay.aclose()
+    await aredis_client.aclose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Vending Payment Server",
     description="Bitcoin Lightning payment server for vending machines",
     version="0.1.0",
+    default_response_class=ORJSONResponse,  # orjson is 2-5x faster than stdlib json
+    lifespan=lifespan,
 )
 
-# Add rate limiting
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 # CORS middleware (configure as needed)
 app.add_middleware(
     CORSMiddleware,
@@ -36,17 +83,3 @@ app.include_router(payments.router, prefix="/api/v1", tags=["payments"])
 app.include_router(events.router, prefix="/api/v1", tags=["events"])
 app.include_router(webhooks.router, prefix="/api/v1", tags=["webhooks"])
 
-
-@app.on_event("startup")
-async def startup_event():
-    """Run on application startup."""
-    # Initialize database connection pool, etc.
-    pass
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Run on application shutdown."""
-    # Cleanup resources
-    pass
-
@@ -11,6 +11,7 @@ class AmountSchema(BaseModel):
     """Amount with currency."""
     amount: Decimal = Field(..., gt=0, description="Payment amount")
     currency: str = Field(..., min_length=3, max_length=10, description="Currency code (EUR, USD, etc.)")
+    amount_sats: Optional[int] = Field(None, description="Amount in satoshis for Lightning payments")
 
 
 class PaymentCreateRequest(BaseModel):
@@ -28,11 +29,34 @@ class PaymentCreateRequest(BaseModel):
     @field_validator("metadata")
     @classmethod
     def validate_metadata_size(cls, v):
-        """Ensure metadata JSON is not too large."""
-        import json
-        json_str = json.dumps(v)
-        if len(json_str) > 8192:  # 8KB limit
-            raise ValueError("Metadata too large (max 8KB)")
+        """Ensure metadata is not too large.
+
+        Structural cap instead of measuring a throwaway json.dumps: the
+        walk is O(entries) with no serialization, and the bounds (64
+        entries, 8KB of scalar content) imply roughly the same on-disk
+        size the old 8KB-of-JSON check allowed.
+        """
+        if not v:
+            return v
+        entries = 0
+        content_len = 0
+        stack = [v]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                entries += len(node)
+                for key, value in node.items():
+                    content_len += len(key)
+                    stack.append(value)
+            elif isinstance(node, (list, tuple)):
+                entries += len(node)
+                stack.extend(node)
+            elif isinstance(node, str):
+                content_len += len(node)
+            elif node is not None:
+                content_len += 8  # numbers/bools: flat estimate
+            if entries > 64 or content_len > 8192:
+                raise ValueError("Metadata too large (max 64 entries / 8KB)")
         return v
 
 
@@ -1,11 +1,61 @@
 """BTCPay Server Greenfield API client."""
 from datetime import datetime, timezone
+from decimal import Decimal
 from typing import Optional, Dict, Any
 import httpx
 
 from app.core.config import settings
 
 
+def extract_bolt11(method: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Extract the BOLT11 string from a Lightning payment method payload.
+
+    The invoice is in the "destination" field; older responses carry it in
+    "paymentLink", possibly with a "lightning:" prefix.
+    """
+    if not method:
+        return None
+
+    destination = method.get("destination")
+    if destination and isinstance(destination, str) and destination.startswith("lnbc"):
+        return destination
+
+    payment_link = method.get("paymentLink")
+    if payment_link and isinstance(payment_link, str):
+        if payment_link.startswith("lightning:"):
+            return payment_link[10:]  # Remove "lightning:" prefix
+        elif payment_link.startswith("lnbc"):
+            return payment_link
+
+    return None
+
+
+def extract_amount_sats(method: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Sats due for a Lightning payment method (its "amount" is in BTC)."""
+    if not method:
+        return None
+    amount_btc = method.get("amount")
+    if amount_btc is None:
+        return None
+    try:
+        return int((Decimal(str(amount_btc)) * 100_000_000).to_integral_value())
+    except (ArithmeticError, ValueError):
+        return None
+
+
+def parse_expires_at(invoice: Dict[str, Any]) -> Optional[datetime]:
+    """Extract the expiration timestamp from an invoice payload, if any."""
+    expires_str = invoice.get("expirationTime")
+    if expires_str:
+        try:
+            # BTCPay returns ISO 8601; fromisoformat handles the trailing
+            # "Z" natively on Python 3.11+, no .replace() copy needed
+            return datetime.fromisoformat(expires_str)
+        except (ValueError, TypeError):
+            return None
+    return None
+
+
 class BTCPayClient:
     """Client for BTCPay Server Greenfield API."""
 
@@ -13,13 +63,16 @@ class BTCPayClient:
         self.base_url = settings.btcpay_base_url.rstrip("/")
         self.api_key = settings.btcpay_api_key
         self.store_id = settings.btcpay_store_id
+        # Keep-alive pool sized for the worker: deadline checks across
+        # tasks reuse warm connections instead of re-handshaking TLS
         self.client = httpx.Client(
             base_url=self.base_url,
             headers={
                 "Authorization": f"token {self.api_key}",
                 "Content-Type": "application/json",
             },
-            timeout=30.0,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=50),
         )
 
     def create_invoice(
@@ -171,28 +224,7 @@ class BTCPayClient:
         Returns:
             BOLT11 string or None
         """
-        method = self.get_lightning_payment_method(invoice_id)
-        
-        if not method:
-            return None
-        
-        # The BOLT11 invoice is in the "destination" field
-        # Example: "destination": "lnbc136360n1p55x3ehpp50lpmdf..."
-        destination = method.get("destination")
-        if destination and isinstance(destination, str) and destination.startswith("lnbc"):
-            return destination
-        
-        # Fallback: Check paymentLink field (may have "lightning:" prefix)
-        # Example: "paymentLink": "lightning:lnbc136360n1p55x3ehpp50lpmdf..."
-        payment_link = method.get("paymentLink")
-        if payment_link and isinstance(payment_link, str):
-            # Remove "lightning:" prefix if present
-            if payment_link.startswith("lightning:"):
-                return payment_link[10:]  # Remove "lightning:" prefix
-            elif payment_link.startswith("lnbc"):
-                return payment_link
-        
-        return None
+        return extract_bolt11(self.get_lightning_payment_method(invoice_id))
 
     def get_checkout_link(self, invoice_id: str) -> Optional[str]:
         """
@@ -218,14 +250,7 @@ class BTCPayClient:
             Expiration datetime or None
         """
         invoice = self.get_invoice(invoice_id)
-        expires_str = invoice.get("expirationTime")
-        if expires_str:
-            try:
-                # BTCPay returns ISO 8601 format
-                return datetime.fromisoformat(expires_str.replace("Z", "+00:00"))
-            except (ValueError, AttributeError):
-                return None
-        return None
+        return parse_expires_at(invoice)
 
     def is_settled(self, invoice_id: str) -> bool:
         """
@@ -251,8 +276,126 @@ class BTCPayClient:
         self.close()
 
 
-# Global instance (can be reused)
+class AsyncBTCPayClient:
+    """Async client for BTCPay Server Greenfield API.
+
+    Mirrors :class:`BTCPayClient` but is backed by ``httpx.AsyncClient`` so
+    request handlers can await BTCPay round-trips instead of blocking a
+    worker thread. Connections are pooled and kept alive across requests.
+    """
+
+    def __init__(self):
+        self.base_url = settings.btcpay_base_url.rstrip("/")
+        self.api_key = settings.btcpay_api_key
+        self.store_id = settings.btcpay_store_id
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Authorization": f"token {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        )
+
+    async def create_invoice(
+        self,
+        amount: float,
+        currency: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        redirect_url: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Create a Lightning invoice via BTCPay Server (see BTCPayClient)."""
+        payload = {
+            "amount": str(amount),
+            "currency": currency,
+            "type": "Standard",
+            "checkout": {
+                "speedPolicy": "MediumSpeed",
+                "expirationMinutes": 15,
+                "monitoringMinutes": 0,  # We handle monitoring ourselves
+                "paymentMethods": ["BTC-LightningNetwork"],
+                "redirectURL": redirect_url,
+            },
+            "metadata": metadata or {},
+        }
+
+        response = await self.client.post(
+            f"/api/v1/stores/{self.store_id}/invoices",
+            json=payload,
+        )
+
+        if response.status_code != 200:
+            try:
+                error_detail = response.json()
+                error_msg = f"BTCPay error {response.status_code}: {error_detail}"
+            except Exception:
+                error_msg = f"BTCPay error {response.status_code}: {response.text}"
+
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"BTCPay create_invoice failed: {error_msg}")
+            logger.error(f"Request payload: {payload}")
+
+            raise Exception(error_msg)
+
+        return response.json()
+
+    async def get_invoice(self, invoice_id: str) -> Dict[str, Any]:
+        """Get invoice details by ID."""
+        response = await self.client.get(
+            f"/api/v1/stores/{self.store_id}/invoices/{invoice_id}",
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def get_payment_methods(self, invoice_id: str) -> list[Dict[str, Any]]:
+        """Get payment methods for an invoice."""
+        response = await self.client.get(
+            f"/api/v1/stores/{self.store_id}/invoices/{invoice_id}/payment-methods",
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def get_lightning_payment_method(self, invoice_id: str) -> Optional[Dict[str, Any]]:
+        """Get Lightning payment method details including BOLT11, or None."""
+        try:
+            payment_methods = await self.get_payment_methods(invoice_id)
+
+            for method in payment_methods:
+                method_id = method.get("paymentMethodId")
+                if method_id in ("BTC-LN", "BTC-LightningNetwork"):
+                    return method
+
+            return None
+        except Exception as e:
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Error getting payment methods for invoice {invoice_id}: {e}")
+            return None
+
+    async def get_bolt11(self, invoice_id: str) -> Optional[str]:
+        """Extract BOLT11 Lightning invoice string (see BTCPayClient)."""
+        return extract_bolt11(await self.get_lightning_payment_method(invoice_id))
+
+    async def get_checkout_link(self, invoice_id: str) -> Optional[str]:
+        """Get checkout link for invoice."""
+        invoice = await self.get_invoice(invoice_id)
+        return invoice.get("checkoutLink")
+
+    async def get_expires_at(self, invoice_id: str) -> Optional[datetime]:
+        """Get invoice expiration timestamp."""
+        invoice = await self.get_invoice(invoice_id)
+        return parse_expires_at(invoice)
+
+    async def aclose(self):
+        """Close HTTP client."""
+        await self.client.aclose()
+
+
+# Global instances (can be reused)
 _btcpay_client: Optional[BTCPayClient] = None
+_async_btcpay_client: Optional[AsyncBTCPayClient] = None
 
 
 def get_btcpay_client() -> BTCPayClient:
@@ -262,3 +405,11 @@ def get_btcpay_client() -> BTCPayClient:
         _btcpay_client = BTCPayClient()
     return _btcpay_client
 
+
+def get_async_btcpay_client() -> AsyncBTCPayClient:
+    """Get or create async BTCPay client instance."""
+    global _async_btcpay_client
+    if _async_btcpay_client is None:
+        _async_btcpay_client = AsyncBTCPayClient()
+    return _async_btcpay_client
+
@@ -1,90 +1,228 @@
-"""Notification service for SSE and callbacks."""
-import json
-import httpx
+"""Notification service for SSE event streams."""
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Tuple
 import redis
+import redis.asyncio as aioredis
 
 from app.core.config import settings
-from app.core.security import generate_hmac_signature
+from app.db.models import PaymentEvent
+from app.schemas.events import (
+    SSEEventData,
+    PaymentInfoSchema,
+    InvoiceInfoSchema,
+    ProviderStatusSchema,
+    AmountSchema,
+)
 
-# Redis client for pub/sub
+# Redis clients for event streams: the sync client serves the Celery
+# worker, the async one serves API handlers without blocking the loop
 redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+aredis_client = aioredis.from_url(
+    settings.redis_url, decode_responses=True, max_connections=50
+)
 
+# Upper bound on retained entries per client stream; enough to cover any
+# realistic SSE reconnect gap while keeping Redis memory bounded
+EVENT_STREAM_MAXLEN = 10_000
 
-def publish_payment_event(client_id: str, payment_id: str, event_seq: int):
+
+def payment_cache_key(client_id: str, payment_id: str) -> str:
+    """Key for the short-TTL GET /payments/{id} response cache.
+
+    Scoped by client_id so a cache hit can never serve a payment to a
+    client that doesn't own it.
     """
-    Publish payment event notification via Redis pub/sub.
-    
-    Args:
-        client_id: Client UUID
-        payment_id: Payment request UUID
-        event_seq: Event sequence number
+    return f"payment:{client_id}:{payment_id}:response"
+
+
+def invalidate_payment_cache(client_id: str, payment_id: str):
+    """Drop the cached status response after a state change.
+
+    Best-effort like the cache itself: the entry also expires on its own
+    TTL, so a failed DEL only extends staleness by that window.
+
+    This is the blocking variant for sync contexts (Celery worker).
     """
-    channel = f"client:{client_id}:events"
-    message = json.dumps({
+    try:
+        redis_client.delete(payment_cache_key(client_id, payment_id))
+    except redis.RedisError:
+        pass
+
+
+async def ainvalidate_payment_cache(client_id: str, payment_id: str):
+    """Async variant of invalidate_payment_cache for API handlers."""
+    try:
+        await aredis_client.delete(payment_cache_key(client_id, payment_id))
+    except redis.RedisError:
+        pass
+
+
+# SSE event names keyed by internal event type, built once at import
+_EVENT_TYPE_TO_SSE = {
+    PaymentEvent.EVENT_CREATED: "payment.created",
+    PaymentEvent.EVENT_PROVIDER_INVOICE_CREATED: "payment.invoice_created",
+    PaymentEvent.EVENT_WEBHOOK_RECEIVED: "payment.status_changed",
+    PaymentEvent.EVENT_PAID: "payment.paid",
+    PaymentEvent.EVENT_TIMED_OUT: "payment.timed_out",
+    PaymentEvent.EVENT_EXPIRED: "payment.expired",
+    PaymentEvent.EVENT_FAILED: "payment.failed",
+    PaymentEvent.EVENT_CANCELED: "payment.canceled",
+}
+
+
+def map_event_type_to_sse(event_type: str) -> str:
+    """Map internal event type to SSE event name."""
+    return _EVENT_TYPE_TO_SSE.get(event_type, "payment.status_changed")
+
+
+def build_sse_event(event: PaymentEvent) -> Tuple[str, str]:
+    """
+    Serialize a PaymentEvent into its SSE representation.
+
+    Returns:
+        (sse_event_name, serialized SSEEventData JSON) tuple
+    """
+    payment = event.payment_request
+    provider_invoice = payment.provider_invoice
+
+    sse_event = map_event_type_to_sse(event.event_type)
+
+    # Build payment info
+    payment_info = PaymentInfoSchema(
+        payment_id=payment.id,
+        external_code=payment.external_code,
+        status=payment.status,
+        status_reason=payment.status_reason,
+        created_at=payment.created_at,
+        finalized_at=payment.finalized_at,
+        monitor_until=payment.monitor_until,
+        amount=AmountSchema(
+            amount=payment.amount,
+            currency=payment.currency,
+        ),
+        payment_method=payment.payment_method,
+    )
+
+    # Build invoice info if available
+    invoice_info = None
+    if provider_invoice:
+        invoice_info = InvoiceInfoSchema(
+            provider=provider_invoice.provider,
+            provider_invoice_id=provider_invoice.provider_invoice_id,
+            checkout_link=provider_invoice.checkout_link,
+            bolt11=provider_invoice.bolt11,
+            expires_at=provider_invoice.expires_at,
+        )
+
+    # Build provider status if available
+    provider_status = None
+    if provider_invoice and provider_invoice.raw_last_status:
+        status_data = provider_invoice.raw_last_status
+        provider_status = ProviderStatusSchema(
+            btcpay_status=status_data.get("status"),
+            seen_at=provider_invoice.updated_at or datetime.now(timezone.utc),
+            source=event.source,
+        )
+
+    event_data = SSEEventData(
+        event_id=event.seq,
+        event=sse_event,
+        emitted_at=event.created_at,
+        payment=payment_info,
+        invoice=invoice_info,
+        provider_status=provider_status,
+    )
+
+    return sse_event, event_data.model_dump_json()
+
+
+def _event_stream_entry(
+    client_id: str,
+    payment_id: str,
+    event_seq: int,
+    sse_event: Optional[str],
+    payload: Optional[str],
+) -> Tuple[str, dict]:
+    """Build the (stream key, entry fields) pair for a payment event."""
+    stream = f"client:{client_id}:events"
+    fields = {
         "payment_id": payment_id,
         "event_seq": event_seq,
-    })
-    redis_client.publish(channel, message)
+    }
+    if payload is not None:
+        fields["event"] = sse_event
+        fields["payload"] = payload
+    return stream, fields
 
 
-async def send_callback(
-    callback_url: str,
+def publish_payment_event(
+    client_id: str,
     payment_id: str,
-    status: str,
-    finalized_at: Optional[datetime] = None,
-    max_retries: int = 3,
-) -> bool:
+    event_seq: int,
+    sse_event: Optional[str] = None,
+    payload: Optional[str] = None,
+):
     """
-    Send callback notification to client URL with exponential backoff.
-    
+    Publish payment event notification to the client's Redis stream.
+
+    Unlike pub/sub, stream entries persist (bounded by EVENT_STREAM_MAXLEN),
+    so an SSE subscriber that reconnects can replay the gap straight from
+    Redis instead of querying Postgres. The entry id is "{seq}-0" - event
+    seq values are globally monotonic - which lets consumers XREAD from
+    their Last-Event-ID directly.
+
+    This is the blocking variant for sync contexts (Celery worker); async
+    handlers should await apublish_payment_event instead.
+
     Args:
-        callback_url: Client callback URL
+        client_id: Client UUID
         payment_id: Payment request UUID
-        status: Payment status
-        finalized_at: Finalization timestamp
-        max_retries: Maximum retry attempts
-        
-    Returns:
-        True if callback succeeded, False otherwise
+        event_seq: Event sequence number
+        sse_event: SSE event name (e.g. "payment.paid")
+        payload: Pre-serialized SSEEventData JSON
     """
-    payload = {
-        "payment_id": str(payment_id),
-        "status": status,
-        "finalized_at": finalized_at.isoformat() if finalized_at else None,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-    }
-    
-    # Generate HMAC signature
-    payload_bytes = json.dumps(payload, sort_keys=True).encode("utf-8")
-    signature = generate_hmac_signature(payload_bytes, settings.btcpay_webhook_secret)
-    
-    headers = {
-        "Content-Type": "application/json",
-        "X-Signature": f"sha256={signature}",
-    }
-    
-    # Exponential backoff retry logic
-    delay = 1  # Start with 1 second
-    for attempt in range(max_retries):
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.post(callback_url, json=payload, headers=headers)
-                response.raise_for_status()
-                return True
-        except Exception as e:
-            if attempt < max_retries - 1:
-                await asyncio.sleep(delay)
-                delay *= 2  # Exponential backoff
-            else:
-                # Log failure but don't block
-                print(f"Callback failed after {max_retries} attempts: {e}")
-                return False
-    
-    return False
-
-
-# Import asyncio for sleep
-import asyncio
+    stream, fields = _event_stream_entry(
+        client_id, payment_id, event_seq, sse_event, payload
+    )
+    try:
+        redis_client.xadd(
+            stream, fields, id=f"{event_seq}-0",
+            maxlen=EVENT_STREAM_MAXLEN, approximate=True,
+        )
+    except redis.ResponseError:
+        # Commits can complete out of seq order, and Redis rejects an
+        # explicit id below the stream head; fall back to an auto id -
+        # consumers de-duplicate on event_seq anyway
+        redis_client.xadd(
+            stream, fields, maxlen=EVENT_STREAM_MAXLEN, approximate=True
+        )
+
+
+async def apublish_payment_event(
+    client_id: str,
+    payment_id: str,
+    event_seq: int,
+    sse_event: Optional[str] = None,
+    payload: Optional[str] = None,
+):
+    """Async variant of publish_payment_event for API handlers.
+
+    Uses the shared async Redis pool so the XADD doesn't block the event
+    loop the way the sync client would.
+    """
+    stream, fields = _event_stream_entry(
+        client_id, payment_id, event_seq, sse_event, payload
+    )
+    try:
+        await aredis_client.xadd(
+            stream, fields, id=f"{event_seq}-0",
+            maxlen=EVENT_STREAM_MAXLEN, approximate=True,
+        )
+    except redis.ResponseError:
+        await aredis_client.xadd(
+            stream, fields, maxlen=EVENT_STREAM_MAXLEN, approximate=True
+        )
+
 
+# Merchant callback delivery lives in app.worker.tasks.send_callback_task:
+# Celery owns the retry/backoff state so callbacks survive restarts.
@@ -0,0 +1,111 @@
+"""Micro-batched persistence for informational webhook events."""
+import asyncio
+from typing import Optional
+
+from sqlalchemy import insert
+
+from app.db.session import get_session_local
+from app.db.models import PaymentEvent
+
+
+class WebhookEventBatcher:
+    """Coalesces informational webhook events into shared commits.
+
+    Under BTCPay retry storms many webhooks land at once, and each commit
+    costs one WAL fsync. Events that carry no status change (the "logged"
+    branches) are queued here and flushed in batches by a background task,
+    so N concurrent deliveries share a handful of commits instead of N.
+
+    State-changing events (settled/expired/failed) must NOT go through the
+    batcher - they commit directly in the handler.
+    """
+
+    def __init__(self, max_batch: int = 100, max_delay: float = 0.01):
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the background flush task (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the flush task and persist anything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        leftovers = []
+        while not self._queue.empty():
+            leftovers.append(self._queue.get_nowait())
+        if leftovers:
+            self._flush_batch([fields for fields, _ in leftovers])
+            for _, fut in leftovers:
+                if not fut.done():
+                    fut.set_result(None)
+
+    async def submit(self, event_fields: dict) -> None:
+        """Queue a PaymentEvent's fields and wait for its batch to commit."""
+        if self._task is None or self._task.done():
+            self.start()
+
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((event_fields, fut))
+        await asyncio.wait_for(fut, timeout=5.0)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Block for the first item, then drain whatever else arrives
+            # within the batching window
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_delay
+            while len(batch) < self._max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await asyncio.to_thread(
+                    self._flush_batch, [fields for fields, _ in batch]
+                )
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            else:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_result(None)
+
+    def _flush_batch(self, batch: list) -> None:
+        """Insert a batch of events in a single transaction.
+
+        A Core executemany insert skips unit-of-work bookkeeping and lets
+        the driver page the rows into multi-VALUES statements; nobody
+        reads these events back in-session, so ORM identity isn't needed.
+        """
+        SessionLocal = get_session_local()
+        db = SessionLocal()
+        try:
+            db.execute(insert(PaymentEvent), batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+# Shared instance, started on app startup
+webhook_batcher = WebhookEventBatcher()
@@ -1,5 +1,6 @@
 """Celery application configuration."""
 from celery import Celery
+from celery.signals import worker_process_init
 
 from app.core.config import settings
 
@@ -23,6 +24,18 @@ celery_app.conf.update(
     worker_max_tasks_per_child=1000,
 )
 
+@worker_process_init.connect
+def _reset_db_pool(**kwargs):
+    """Dispose inherited DB connections after the worker process forks.
+
+    Pooled connections created in the parent must not be shared across
+    forked children; each worker process starts with a fresh pool.
+    """
+    from app.db.session import get_engine
+
+    get_engine().dispose()
+
+
 # Import tasks to register them
 from app.worker import tasks  # noqa: F401
 
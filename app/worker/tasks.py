@@ -1,8 +1,15 @@
 """Celery tasks for payment monitoring."""
-import time
+import logging
+import random
 from datetime import datetime, timezone
+from typing import Optional
 from uuid import UUID
 
+import httpx
+import orjson
+from celery.exceptions import Retry
+from sqlalchemy.orm import joinedload
+
 from app.worker.celery_app import celery_app
 from app.db.session import get_session_local
 from app.db.models import (
@@ -10,104 +17,215 @@ from app.db.models import (
     ProviderInvoice,
     PaymentEvent,
 )
-from app.services.btcpay import BTCPayClient
-from app.services.notifications import publish_payment_event, send_callback
+from app.core.security import generate_hmac_signature
+from app.services.btcpay import get_btcpay_client
+from app.services.notifications import (
+    build_sse_event,
+    invalidate_payment_cache,
+    publish_payment_event,
+)
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Shared HTTP client for callback egress; worker processes are long-lived,
+# so pooled keep-alive connections are reused across tasks
+_callback_http: Optional[httpx.Client] = None
+
 
-@celery_app.task(name="monitor_payment", bind=True, max_retries=0)
-def monitor_payment(self, payment_id: str):
+def _get_callback_http() -> httpx.Client:
+    global _callback_http
+    if _callback_http is None:
+        _callback_http = httpx.Client(
+            timeout=5.0,
+            limits=httpx.Limits(max_keepalive_connections=100),
+        )
+    return _callback_http
+
+
+def _retry_countdown(retries: int, cap: int = 60) -> float:
+    """Exponential backoff with jitter for task retries.
+
+    The randomization spreads retries from tasks that failed together
+    (e.g. during a BTCPay or merchant outage) so they don't come back as
+    one synchronized storm.
     """
-    Monitor payment for 2 minutes from creation.
-    
-    - Polls BTCPay every 5 seconds as webhook fallback
-    - Marks TIMED_OUT if not paid within window
-    - Triggers notifications on status change
+    return min(2 ** retries, cap) * random.uniform(0.5, 1.5)
+
+
+@celery_app.task(name="send_callback", bind=True, max_retries=8)
+def send_callback_task(self, callback_url: str, payment_id: str, status: str, finalized_at: str = None):
+    """
+    Deliver a merchant callback from the worker.
+
+    Keeps the outbound HTTP POST off the webhook response path (BTCPay
+    gets its 200 immediately), and retry state lives in the broker: a
+    failed delivery is re-queued with exponential backoff (1, 2, 4... up
+    to 60s, 8 attempts) and survives worker restarts instead of pinning
+    an in-process sleep loop.
+    """
+    payload = {
+        "payment_id": payment_id,
+        "status": status,
+        "finalized_at": finalized_at,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+    # Sign the exact bytes that go on the wire; orjson encodes straight
+    # to UTF-8 bytes in C, several times faster than the stdlib encoder
+    payload_bytes = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    signature = generate_hmac_signature(payload_bytes, settings.btcpay_webhook_secret)
+
+    headers = {
+        "Content-Type": "application/json",
+        "X-Signature": f"sha256={signature}",
+    }
+
+    try:
+        response = _get_callback_http().post(
+            callback_url, content=payload_bytes, headers=headers
+        )
+        response.raise_for_status()
+    except Exception as e:
+        if self.request.retries >= self.max_retries:
+            logger.warning(
+                "Callback for payment %s to %s dropped after %d attempts: %s",
+                payment_id, callback_url, self.request.retries + 1, e,
+            )
+            return
+        raise self.retry(exc=e, countdown=_retry_countdown(self.request.retries))
+
+
+@celery_app.task(name="check_payment_timeout", bind=True, max_retries=5)
+def check_payment_timeout(self, payment_id: str):
+    """
+    One-shot terminal check, scheduled with apply_async(eta=monitor_until).
+
+    The broker holds the deadline, so no worker slot is occupied while a
+    payment is pending - webhooks finalize in-window payments, and this
+    task only runs once at the deadline: one confirming BTCPay poll to
+    guard against a lost webhook, then TIMED_OUT.
+
+    If BTCPay itself is unreachable at the deadline the task retries
+    with jittered backoff rather than timing the payment out blind - a
+    settled-but-webhookless payment must not be marked TIMED_OUT just
+    because the provider had a blip.
     """
     SessionLocal = get_session_local()
     db = SessionLocal()
-    
+
     try:
-        payment = db.query(PaymentRequest).filter(PaymentRequest.id == UUID(payment_id)).first()
+        # Eager-join the 1:1 invoice; the confirm path needs it
+        payment = (
+            db.query(PaymentRequest)
+            .options(joinedload(PaymentRequest.provider_invoice))
+            .filter(PaymentRequest.id == UUID(payment_id))
+            .first()
+        )
         if not payment:
-            print(f"Payment {payment_id} not found")
+            logger.warning("Payment %s not found", payment_id)
             return
-        
-        # If already finalized, skip
+
+        # Finalized in-window (webhook or manual action): nothing to do
         if payment.finalized_at:
-            print(f"Payment {payment_id} already finalized")
             return
-        
+
         provider_invoice = payment.provider_invoice
         if not provider_invoice:
-            print(f"No provider invoice for payment {payment_id}")
+            logger.warning("No provider invoice for payment %s", payment_id)
             return
-        
-        btcpay = BTCPayClient()
-        
+
+        # Process-wide client: its keep-alive pool amortizes the TLS
+        # handshake across every deadline check the worker runs
+        btcpay = get_btcpay_client()
+        invoice_data = None
         try:
-            # Loop until monitor_until time
-            while datetime.now(timezone.utc) < payment.monitor_until:
-                # Refresh payment from DB (webhook may have updated it)
-                db.refresh(payment)
-                
-                # If already finalized by webhook, exit
-                if payment.finalized_at:
-                    print(f"Payment {payment_id} finalized by webhook")
-                    break
-                
-                # Poll BTCPay status
-                try:
-                    is_settled = btcpay.is_settled(provider_invoice.provider_invoice_id)
-                    
-                    if is_settled:
-                        # Payment received!
-                        _mark_payment_paid(db, payment, provider_invoice, btcpay)
-                        break
-                    
-                    # Update provider status
-                    invoice_data = btcpay.get_invoice(provider_invoice.provider_invoice_id)
-                    provider_invoice.raw_last_status = invoice_data
-                    db.commit()
-                    
-                except Exception as e:
-                    print(f"Error polling BTCPay for {payment_id}: {e}")
-                    # Continue monitoring despite poll error
-                
-                # Sleep before next poll
-                time.sleep(settings.payment_poll_interval_seconds)
-            
-            # Check if we exited loop without payment
-            db.refresh(payment)
-            if not payment.finalized_at:
-                # Timeout reached without payment
-                _mark_payment_timed_out(db, payment)
-        
-        finally:
-            btcpay.close()
-    
+            invoice_data = btcpay.get_invoice(provider_invoice.provider_invoice_id)
+        except httpx.HTTPError as e:
+            if self.request.retries < self.max_retries:
+                logger.warning(
+                    "BTCPay unreachable for %s, retrying: %s", payment_id, e
+                )
+                raise self.retry(
+                    exc=e, countdown=_retry_countdown(self.request.retries)
+                )
+            logger.warning(
+                "BTCPay still unreachable for %s after %d retries; timing out",
+                payment_id, self.request.retries,
+            )
+        except Exception as e:
+            logger.warning("Error polling BTCPay for %s: %s", payment_id, e)
+
+        if invoice_data is not None:
+            if invoice_data.get("status") == "Settled":
+                # Webhook was lost but the payment went through
+                _mark_payment_paid(db, payment, provider_invoice, invoice_data)
+                return
+            provider_invoice.raw_last_status = invoice_data
+
+        _mark_payment_timed_out(db, payment)
+
+    except Retry:
+        # Let the retry signal reach Celery untouched
+        raise
+
     except Exception as e:
-        print(f"Error in monitor_payment for {payment_id}: {e}")
+        logger.error("Error in check_payment_timeout for %s: %s", payment_id, e)
         db.rollback()
         raise
-    
+
     finally:
         db.close()
 
 
-def _mark_payment_paid(db, payment: PaymentRequest, provider_invoice: ProviderInvoice, btcpay: BTCPayClient):
-    """Mark payment as paid and notify."""
+def _notify_finalized(payment: PaymentRequest, event_seq: int, sse_event: str,
+                      sse_payload: str, status: str, now: datetime):
+    """Post-commit notification fan-out for a finalized payment.
+
+    Runs strictly after the commit so subscribers never hear about state
+    that might roll back, and failures here are logged rather than
+    raised: the finalization is durable, and re-raising would make
+    Celery re-run a task that now early-returns on finalized_at without
+    ever re-publishing. Missed SSE entries are recoverable via replay.
+    """
+    try:
+        publish_payment_event(str(payment.client_id), str(payment.id),
+                              event_seq, sse_event, sse_payload)
+    except Exception as e:
+        logger.error("Failed to publish event for payment %s: %s", payment.id, e)
+
+    # Drop the cached poll response so the next status GET sees the
+    # terminal state immediately (already guarded internally)
+    invalidate_payment_cache(str(payment.client_id), str(payment.id))
+
+    if payment.callback_url:
+        try:
+            send_callback_task.delay(
+                payment.callback_url,
+                str(payment.id),
+                status,
+                now.isoformat(),
+            )
+        except Exception as e:
+            logger.error("Failed to enqueue callback for payment %s: %s", payment.id, e)
+
+
+def _mark_payment_paid(db, payment: PaymentRequest, provider_invoice: ProviderInvoice, invoice_data: dict):
+    """Mark payment as paid and notify.
+
+    `invoice_data` is the invoice payload the caller already fetched,
+    so finalizing doesn't re-query BTCPay.
+    """
     if payment.finalized_at:
         return  # Already finalized
-    
+
     now = datetime.now(timezone.utc)
-    
+
     # Update payment
     payment.status = PaymentRequest.STATUS_PAID
     payment.finalized_at = now
-    
+
     # Update provider invoice status
-    invoice_data = btcpay.get_invoice(provider_invoice.provider_invoice_id)
     provider_invoice.raw_last_status = invoice_data
     
     # Create event
@@ -121,20 +239,13 @@ def _mark_payment_paid(db, payment: PaymentRequest, provider_invoice: ProviderIn
         payload={"btcpay_status": invoice_data.get("status")},
     )
     db.add(event)
+    db.flush()
+    sse_event, sse_payload = build_sse_event(event)
+    event.sse_payload = sse_payload
     db.commit()
-    
-    # Publish notification
-    publish_payment_event(str(payment.client_id), str(payment.id), event.seq)
-    
-    # Send callback if configured
-    if payment.callback_url:
-        import asyncio
-        asyncio.run(send_callback(
-            payment.callback_url,
-            payment.id,
-            PaymentRequest.STATUS_PAID,
-            now,
-        ))
+
+    _notify_finalized(payment, event.seq, sse_event, sse_payload,
+                      PaymentRequest.STATUS_PAID, now)
 
 
 def _mark_payment_timed_out(db, payment: PaymentRequest):
@@ -160,18 +271,11 @@ def _mark_payment_timed_out(db, payment: PaymentRequest):
         payload={"reason": payment.status_reason},
     )
     db.add(event)
+    db.flush()
+    sse_event, sse_payload = build_sse_event(event)
+    event.sse_payload = sse_payload
     db.commit()
-    
-    # Publish notification
-    publish_payment_event(str(payment.client_id), str(payment.id), event.seq)
-    
-    # Send callback if configured
-    if payment.callback_url:
-        import asyncio
-        asyncio.run(send_callback(
-            payment.callback_url,
-            payment.id,
-            PaymentRequest.STATUS_TIMED_OUT,
-            now,
-        ))
+
+    _notify_finalized(payment, event.seq, sse_event, sse_payload,
+                      PaymentRequest.STATUS_TIMED_OUT, now)
 
@@ -11,12 +11,12 @@ This script demonstrates the complete payment flow:
 
 import argparse
 import asyncio
+import functools
 import sys
 import time
-from datetime import datetime, timezone
+from datetime import datetime
 from decimal import Decimal
 from typing import Optional
-from urllib.parse import urljoin
 
 import httpx
 import qrcode
@@ -39,22 +39,27 @@ class PaymentClient:
         self.machine_id = machine_id
         self.password = password
         self.token: Optional[str] = None
-        self.client = httpx.Client(timeout=30.0)
-
-    def _url(self, path: str) -> str:
-        """Build full URL from path."""
-        return urljoin(self.server_url, path)
+        # Async client with keep-alive: the 2s status polls reuse one
+        # pooled connection instead of opening a socket per poll, and
+        # awaiting the calls keeps the Rich Live refresh responsive.
+        # base_url lets httpx parse the server URL once instead of
+        # urljoin-ing on every call.
+        self.client = httpx.AsyncClient(
+            base_url=self.server_url,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=4),
+        )
 
-    def health_check(self) -> dict:
+    async def health_check(self) -> dict:
         """Check server health."""
-        response = self.client.get(self._url("/health"))
+        response = await self.client.get("/health")
         response.raise_for_status()
         return response.json()
 
-    def authenticate(self) -> dict:
+    async def authenticate(self) -> dict:
         """Authenticate and obtain JWT token."""
-        response = self.client.post(
-            self._url("/api/v1/auth/token"),
+        response = await self.client.post(
+            "/api/v1/auth/token",
             json={
                 "machine_id": self.machine_id,
                 "password": self.password,
@@ -67,9 +72,12 @@ class PaymentClient:
         response.raise_for_status()
         data = response.json()
         self.token = data["access_token"]
+        # Set once on the client; every later request carries it without
+        # rebuilding a headers dict per call
+        self.client.headers["Authorization"] = f"Bearer {self.token}"
         return data
 
-    def create_payment(
+    async def create_payment(
         self, amount: Decimal, currency: str = "EUR", external_code: Optional[str] = None
     ) -> dict:
         """Create a payment request."""
@@ -79,9 +87,8 @@ class PaymentClient:
         if external_code is None:
             external_code = f"DEMO-{int(time.time())}"
 
-        response = self.client.post(
-            self._url("/api/v1/payments"),
-            headers={"Authorization": f"Bearer {self.token}"},
+        response = await self.client.post(
+            "/api/v1/payments",
             json={
                 "payment_method": "BTC_LN",
                 "amount": str(amount),
@@ -97,23 +104,24 @@ class PaymentClient:
         response.raise_for_status()
         return response.json()
 
-    def get_payment_status(self, payment_id: str) -> dict:
+    async def get_payment_status(self, payment_id: str) -> dict:
         """Get payment status."""
         if not self.token:
             raise ValueError("Not authenticated. Call authenticate() first.")
 
-        response = self.client.get(
-            self._url(f"/api/v1/payments/{payment_id}"),
-            headers={"Authorization": f"Bearer {self.token}"},
-        )
+        response = await self.client.get(f"/api/v1/payments/{payment_id}")
         response.raise_for_status()
         return response.json()
 
-    def close(self):
+    async def close(self):
         """Close HTTP client."""
-        self.client.close()
+        await self.client.aclose()
 
 
+# Memoized: the Live loop re-renders every second but the BOLT11 never
+# changes for a given payment, so the Reed-Solomon encode + matrix walk
+# only runs once per invoice
+@functools.lru_cache(maxsize=8)
 def generate_qr_ascii(data: str, border: int = 1) -> str:
     """Generate ASCII art QR code with white background and black squares."""
     qr = qrcode.QRCode(border=border)
@@ -121,18 +129,22 @@ def generate_qr_ascii(data: str, border: int = 1) -> str:
     qr.make(fit=True)
 
     # Generate ASCII art using blocks
-    # QR codes should have WHITE background and BLACK squares (inverted from terminal default)
-    output = []
+    # QR codes should have WHITE background and BLACK squares (inverted
+    # from terminal default): space for QR data, full block for background.
+    # Built with join rather than += so each row is one allocation instead
+    # of a quadratic chain of string copies.
     matrix = qr.get_matrix()
-    for row in matrix:
-        line = ""
-        for cell in row:
-            # Use space for black (QR data), full block for white (background)
-            # This creates the correct QR code appearance
-            line += "  " if cell else "██"
-        output.append(line)
+    return "\n".join(
+        "".join("  " if cell else "██" for cell in row) for row in matrix
+    )
+
 
-    return "\n".join(output)
+# Memoized like the QR render: the ISO string is constant per invoice,
+# so each Live frame costs an epoch subtraction instead of a re-parse
+@functools.lru_cache(maxsize=8)
+def _parse_expiry_ts(expires_at: str) -> float:
+    """Parse an ISO expiry string to an epoch timestamp."""
+    return datetime.fromisoformat(expires_at.replace("Z", "+00:00")).timestamp()
 
 
 def format_time_remaining(expires_at: str) -> tuple[str, str]:
@@ -141,9 +153,7 @@ def format_time_remaining(expires_at: str) -> tuple[str, str]:
     Returns (formatted_string, color)
     """
     try:
-        expiry = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
-        now = datetime.now(timezone.utc)
-        remaining = (expiry - now).total_seconds()
+        remaining = _parse_expiry_ts(expires_at) - time.time()
 
         if remaining <= 0:
             return "EXPIRED", "red"
@@ -317,7 +327,7 @@ async def monitor_payment(client: PaymentClient, payment_id: str, payment_data:
                 poll_count += 1
 
                 try:
-                    status_data = client.get_payment_status(payment_id)
+                    status_data = await client.get_payment_status(payment_id)
                     status = status_data["status"]
 
                     # Update display
@@ -335,7 +345,7 @@ async def monitor_payment(client: PaymentClient, payment_id: str, payment_data:
     # Final status
     console.print("\n")
     try:
-        final_status = client.get_payment_status(payment_id)
+        final_status = await client.get_payment_status(payment_id)
         status = final_status["status"]
 
         if status == "PAID":
@@ -441,7 +451,7 @@ Examples:
             task = progress.add_task("🏥 Checking server health...", total=None)
 
             try:
-                health = client.health_check()
+                health = await client.health_check()
                 progress.update(task, completed=True)
 
                 if health.get("status") == "ok":
@@ -466,7 +476,7 @@ Examples:
             task = progress.add_task("🔐 Authenticating...", total=None)
 
             try:
-                auth_data = client.authenticate()
+                auth_data = await client.authenticate()
                 progress.update(task, completed=True)
                 console.print("[green]✓[/green] Authentication successful")
                 console.print(f"  Token expires in: {auth_data['expires_in']} seconds")
@@ -491,7 +501,7 @@ Examples:
             )
 
             try:
-                payment_data = client.create_payment(args.amount)
+                payment_data = await client.create_payment(args.amount)
                 progress.update(task, completed=True)
                 console.print("[green]✓[/green] Payment created")
                 console.print(f"  Payment ID: {payment_data['payment_id']}")
@@ -510,7 +520,7 @@ Examples:
         await monitor_payment(client, payment_data["payment_id"], payment_data)
 
     finally:
-        client.close()
+        await client.close()
 
     console.print("\n[dim]Demo complete![/dim]\n")
 
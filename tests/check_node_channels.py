@@ -3,42 +3,43 @@
 Check Lightning node channels using public explorers
 """
 
+import asyncio
+
 import httpx
 from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
 
 console = Console()
 
 NODE_PUBKEY = "027cb4e4bf5bd1d12493b419b4843c4abdd8bda4f443392f24cc4ed2185291e3c2"
 
+# Built once at import; the pubkey is a module constant so there is
+# nothing to re-interpolate per call
+_AMBOSS_QUERY = f"""
+{{
+  getNode(pubkey: "{NODE_PUBKEY}") {{
+    pubkey
+    alias
+    capacity
+    channel_count
+    graph_info {{
+      channels
+      capacity
+    }}
+  }}
+}}
+"""
+
 
-def check_with_amboss():
+async def check_with_amboss(client):
     """Check node using Amboss API."""
     console.print("\n[cyan]Checking node on Amboss...[/cyan]")
-    
+
     try:
-        client = httpx.Client(timeout=30.0)
-        
-        # Amboss public API
-        response = client.get(
-            f"https://api.amboss.space/graphql",
-            params={
-                "query": f"""
-                {{
-                  getNode(pubkey: "{NODE_PUBKEY}") {{
-                    pubkey
-                    alias
-                    capacity
-                    channel_count
-                    graph_info {{
-                      channels
-                      capacity
-                    }}
-                  }}
-                }}
-                """
-            }
+        # Amboss public API; GraphQL goes in a POST body rather than a
+        # URL-encoded query string
+        response = await client.post(
+            "https://api.amboss.space/graphql",
+            json={"query": _AMBOSS_QUERY},
         )
         
         if response.status_code == 200:
@@ -58,14 +59,12 @@ def check_with_amboss():
         return False
 
 
-def check_with_1ml():
+async def check_with_1ml(client):
     """Check node using 1ML API."""
     console.print("\n[cyan]Checking node on 1ML...[/cyan]")
     
     try:
-        client = httpx.Client(timeout=30.0)
-        
-        response = client.get(
+        response = await client.get(
             f"https://1ml.com/node/{NODE_PUBKEY}/json"
         )
         
@@ -80,24 +79,35 @@ def check_with_1ml():
             channels = node.get('channels', [])
             if channels:
                 console.print(f"\n[bold]Channel Details:[/bold]")
-                
-                table = Table()
-                table.add_column("Peer", style="cyan")
-                table.add_column("Capacity", style="magenta")
-                table.add_column("Status", style="green")
-                
-                for ch in channels[:10]:  # Show first 10
-                    peer_alias = ch.get('node2_alias', 'Unknown') if ch.get('node1_pub') == NODE_PUBKEY else ch.get('node1_alias', 'Unknown')
-                    capacity = ch.get('capacity', 0)
-                    status = "Active" if ch.get('active') else "Inactive"
-                    
-                    table.add_row(
-                        peer_alias[:30],
-                        f"{capacity:,}",
-                        status
-                    )
-                
-                console.print(table)
+
+                # A one-row Table is all box-drawing overhead; print a
+                # plain line for a single channel and keep the Table for
+                # lists that actually benefit from columns
+                if len(channels) < 2:
+                    for ch in channels:
+                        peer_alias = ch.get('node2_alias', 'Unknown') if ch.get('node1_pub') == NODE_PUBKEY else ch.get('node1_alias', 'Unknown')
+                        status = "Active" if ch.get('active') else "Inactive"
+                        console.print(f"  {peer_alias[:30]}: {ch.get('capacity', 0):,} sats ({status})")
+                else:
+                    from rich.table import Table
+
+                    table = Table()
+                    table.add_column("Peer", style="cyan")
+                    table.add_column("Capacity", style="magenta")
+                    table.add_column("Status", style="green")
+
+                    for ch in channels[:10]:  # Show first 10
+                        peer_alias = ch.get('node2_alias', 'Unknown') if ch.get('node1_pub') == NODE_PUBKEY else ch.get('node1_alias', 'Unknown')
+                        capacity = ch.get('capacity', 0)
+                        status = "Active" if ch.get('active') else "Inactive"
+
+                        table.add_row(
+                            peer_alias[:30],
+                            f"{capacity:,}",
+                            status
+                        )
+
+                    console.print(table)
                 
                 # Check for inbound liquidity indicators
                 total_capacity = node.get('capacity', 0)
@@ -127,14 +137,12 @@ def check_with_1ml():
         return False
 
 
-def check_with_mempool():
+async def check_with_mempool(client):
     """Check node using Mempool.space API."""
     console.print("\n[cyan]Checking node on Mempool.space...[/cyan]")
     
     try:
-        client = httpx.Client(timeout=30.0)
-        
-        response = client.get(
+        response = await client.get(
             f"https://mempool.space/api/v1/lightning/nodes/{NODE_PUBKEY}"
         )
         
@@ -167,51 +175,73 @@ def check_with_mempool():
         return False
 
 
-def main():
+async def main():
     """Main check routine."""
+    from rich.panel import Panel
+
     console.print(Panel.fit(
         "[bold cyan]Lightning Node Channel Check[/bold cyan]\n"
         f"[dim]Node: {NODE_PUBKEY[:20]}...[/dim]",
         border_style="cyan"
     ))
     
-    # Try multiple explorers
-    found = False
-    
-    found = check_with_mempool() or found
-    found = check_with_1ml() or found
+    # The explorers are independent, so query all three concurrently:
+    # wall-clock becomes the slowest explorer instead of the sum. One
+    # pooled client serves every check, and the context manager closes
+    # the sockets the old per-check clients leaked.
+    # Tight per-phase timeouts bound the worst case: gather waits for the
+    # slowest explorer, and a dead one should cost seconds, not 30s. The
+    # transport retries connect failures once.
+    async with httpx.AsyncClient(
+        timeout=httpx.Timeout(connect=3.0, read=10.0, write=10.0, pool=5.0),
+        limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=30.0),
+        transport=httpx.AsyncHTTPTransport(retries=1),
+    ) as client:
+        results = await asyncio.gather(
+            check_with_mempool(client),
+            check_with_1ml(client),
+            check_with_amboss(client),
+            return_exceptions=True,
+        )
+    found = any(r is True for r in results)
     
+    # Static advice blocks go out as one print each, so rich parses the
+    # markup once per block instead of once per line
     if not found:
-        console.print("\n[red]Could not find node information on public explorers[/red]")
-        console.print("\n[yellow]This could mean:[/yellow]")
-        console.print("  1. The node is private/not announced")
-        console.print("  2. The node is offline")
-        console.print("  3. The node has no public channels")
-        console.print("\n[bold]Next steps:[/bold]")
-        console.print("  1. Check if your Lightning node is running")
-        console.print("  2. In BTCPay: Go to Lightning > Node Info")
-        console.print("  3. Check if you have any channels open")
-        console.print("  4. If no channels, you need to open some!")
+        console.print(
+            "\n[red]Could not find node information on public explorers[/red]\n"
+            "\n[yellow]This could mean:[/yellow]\n"
+            "  1. The node is private/not announced\n"
+            "  2. The node is offline\n"
+            "  3. The node has no public channels\n"
+            "\n[bold]Next steps:[/bold]\n"
+            "  1. Check if your Lightning node is running\n"
+            "  2. In BTCPay: Go to Lightning > Node Info\n"
+            "  3. Check if you have any channels open\n"
+            "  4. If no channels, you need to open some!"
+        )
     else:
-        console.print("\n[bold cyan]Understanding Inbound Liquidity:[/bold cyan]")
-        console.print("\n[yellow]The 'No route' error means you need INBOUND liquidity.[/yellow]")
-        console.print("\nInbound liquidity = Remote balance in your channels")
-        console.print("This is how much others can send TO you.")
-        console.print("\n[bold]To check your actual inbound liquidity:[/bold]")
-        console.print("  1. Log in to BTCPay Server")
-        console.print("  2. Go to: Lightning > Channels")
-        console.print("  3. Look at 'Remote Balance' column")
-        console.print("  4. Sum of all remote balances = your inbound liquidity")
-        console.print("\n[bold]If remote balance is 0 or very low:[/bold]")
-        console.print("  • Request channel from LNBIG: https://lnbig.com")
-        console.print("  • Use Amboss Magma: https://amboss.space/magma")
-        console.print("  • Ask peers to open channels to you")
-        console.print("  • Use submarine swaps to get inbound")
+        console.print(
+            "\n[bold cyan]Understanding Inbound Liquidity:[/bold cyan]\n"
+            "\n[yellow]The 'No route' error means you need INBOUND liquidity.[/yellow]\n"
+            "\nInbound liquidity = Remote balance in your channels\n"
+            "This is how much others can send TO you.\n"
+            "\n[bold]To check your actual inbound liquidity:[/bold]\n"
+            "  1. Log in to BTCPay Server\n"
+            "  2. Go to: Lightning > Channels\n"
+            "  3. Look at 'Remote Balance' column\n"
+            "  4. Sum of all remote balances = your inbound liquidity\n"
+            "\n[bold]If remote balance is 0 or very low:[/bold]\n"
+            "  • Request channel from LNBIG: https://lnbig.com\n"
+            "  • Use Amboss Magma: https://amboss.space/magma\n"
+            "  • Ask peers to open channels to you\n"
+            "  • Use submarine swaps to get inbound"
+        )
 
 
 if __name__ == "__main__":
     try:
-        main()
+        asyncio.run(main())
     except KeyboardInterrupt:
         console.print("\n[yellow]Check interrupted[/yellow]")
     except Exception as e:
@@ -4,7 +4,8 @@ import pytest
 from datetime import datetime, timezone
 from uuid import uuid4
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
 # Set test environment variables before importing app
 # Use SQLite for unit tests (faster, no external dependencies)
@@ -24,48 +25,159 @@ os.environ["PAYMENT_POLL_INTERVAL_SECONDS"] = "5"
 from app.db.session import Base, get_db
 from app.db.models import Client, PaymentRequest, ProviderInvoice, PaymentEvent
 from app.core.security import hash_password
-from fastapi.testclient import TestClient
-from app.main import app
 
+# app.main (the full FastAPI app, every router and their service-layer
+# imports) is deliberately not imported here: fixtures import it lazily,
+# so collection-only runs and -k selections that never touch the HTTP
+# client skip the heaviest import in the tree.
 
-@pytest.fixture(scope="function")
-def db_session():
-    """Create a test database session."""
-    # Use in-memory SQLite for tests (or separate test PostgreSQL)
-    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False})
+
+@pytest.fixture(scope="session", autouse=True)
+def _fast_password_hasher():
+    """Swap Argon2 to a minimal-cost profile for the test session.
+
+    Production parameters make each hash/verify cost hundreds of ms by
+    design; tests only need round-trip correctness, and the $argon2id$
+    prefix asserted in test_security is parameter-independent. Set
+    PYTEST_PROD_HASH=1 to keep the deployed parameters (e.g. for a slow
+    integration run that validates them).
+    """
+    if os.getenv("PYTEST_PROD_HASH") == "1":
+        yield
+        return
+
+    from argon2 import PasswordHasher
+    from app.core import security
+
+    original = security.password_hasher
+    security.password_hasher = PasswordHasher(
+        time_cost=1, memory_cost=8, parallelism=1, hash_len=16, salt_len=8
+    )
+    yield
+    security.password_hasher = original
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Session-scoped in-memory SQLite engine with the schema built once.
+
+    StaticPool keeps every connection pointing at the same in-memory
+    database, which would otherwise vanish when a connection closes.
+    """
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
     Base.metadata.create_all(engine)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    
-    session = SessionLocal()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def db_session(engine):
+    """Create a test database session.
+
+    Each test runs inside an external transaction that is rolled back in
+    teardown, so tests stay isolated without re-running DDL per test;
+    create_savepoint lets in-test commit() calls work normally.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(
+        bind=connection, join_transaction_mode="create_savepoint", autoflush=False
+    )
     try:
         yield session
     finally:
         session.close()
-        Base.metadata.drop_all(engine)
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture(scope="session")
+def _test_client():
+    """One TestClient for the whole session.
+
+    Constructed without the context manager so the app lifespan (Redis
+    ping, BTCPay warmup) never runs against services that don't exist in
+    unit tests - the same behavior the old per-test construction had,
+    minus rebuilding the client and its transport every test.
+    """
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
 
 
 @pytest.fixture(scope="function")
-def client(db_session):
+def client(_test_client, db_session):
     """Override get_db dependency with test session."""
+    from app.main import app
+
     def override_get_db():
         try:
             yield db_session
         finally:
             pass
-    
+
     app.dependency_overrides[get_db] = override_get_db
-    test_client = TestClient(app)
-    yield test_client
-    app.dependency_overrides.clear()
+    try:
+        yield _test_client
+    finally:
+        app.dependency_overrides.clear()
+        # Shared client: drop any auth header a test installed
+        _test_client.headers.pop("Authorization", None)
+
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Run async tests on uvloop.
+
+    Same loop production uvicorn uses (--loop uvloop in the API image),
+    so async tests exercise the loop we actually deploy on; it ships
+    with uvicorn[standard]. pytest-asyncio picks this override up for
+    every @pytest.mark.asyncio test.
+    """
+    import uvloop
+
+    return uvloop.EventLoopPolicy()
+
+
+@pytest.fixture(scope="session")
+def argon2_test_vector():
+    """One (password, hash) pair shared by the password-hashing tests.
+
+    hash_password is deterministic-by-input but expensive even on the
+    fast test profile; the verify-direction tests don't need their own
+    fresh hash. Salt randomness keeps its own dedicated test.
+    """
+    password = "test_password_123"
+    return {"password": password, "hash": hash_password(password)}
+
+
+@pytest.fixture(scope="session")
+def hashed_test_password():
+    """Hash the shared test password once per session.
+
+    Argon2 is deliberately slow; recomputing it per test would dominate
+    fixture setup time across the suite.
+    """
+    return hash_password("test_password")
+
+
+# Stable id for the shared test client: each test's rollback recreates
+# the row, but tokens minted earlier keep referencing a valid client
+_TEST_CLIENT_ID = uuid4()
 
 
 @pytest.fixture
-def test_client_obj(db_session):
+def test_client_obj(db_session, hashed_test_password):
     """Create a test client in the database."""
     client = Client(
-        id=uuid4(),
+        id=_TEST_CLIENT_ID,
         machine_id="TEST-KIOSK-001",
-        password_hash=hash_password("test_password"),
+        password_hash=hashed_test_password,
         is_active=True,
         metadata={"test": True},
     )
@@ -75,18 +187,28 @@ def test_client_obj(db_session):
     return client
 
 
+_TOKEN_CACHE = {}
+
+
 @pytest.fixture
 def auth_token(client, test_client_obj):
-    """Get authentication token for test client."""
-    response = client.post(
-        "/api/v1/auth/token",
-        json={
-            "machine_id": "TEST-KIOSK-001",
-            "password": "test_password",
-        },
-    )
-    assert response.status_code == 200
-    return response.json()["access_token"]
+    """Get authentication token for test client.
+
+    Issued once and memoized: token issuance runs the KDF plus an
+    asymmetric signature, and with a 10-minute expiry one token covers
+    the whole run. The stable client id keeps it valid across tests.
+    """
+    if "token" not in _TOKEN_CACHE:
+        response = client.post(
+            "/api/v1/auth/token",
+            json={
+                "machine_id": "TEST-KIOSK-001",
+                "password": "test_password",
+            },
+        )
+        assert response.status_code == 200
+        _TOKEN_CACHE["token"] = response.json()["access_token"]
+    return _TOKEN_CACHE["token"]
 
 
 @pytest.fixture
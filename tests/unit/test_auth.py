@@ -1,4 +1,5 @@
 """Unit tests for authentication endpoints."""
+import asyncio
 import pytest
 from uuid import uuid4
 from app.api.auth import create_token
@@ -9,46 +10,33 @@ from app.core.security import hash_password
 class TestAuthEndpoint:
     """Test authentication endpoint."""
     
-    def test_auth_success(self, client, test_client_obj):
-        """Test successful authentication."""
+    @pytest.mark.parametrize(
+        "machine_id,password,expected",
+        [
+            ("TEST-KIOSK-001", "test_password", 200),
+            ("NONEXISTENT", "test_password", 401),
+            ("TEST-KIOSK-001", "wrong_password", 401),
+        ],
+        ids=["success", "invalid_machine_id", "invalid_password"],
+    )
+    def test_auth_cases(self, client, test_client_obj, machine_id, password, expected):
+        """Credential cases share one body shape and one assertion path."""
         response = client.post(
             "/api/v1/auth/token",
             json={
-                "machine_id": "TEST-KIOSK-001",
-                "password": "test_password",
+                "machine_id": machine_id,
+                "password": password,
             },
         )
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert "access_token" in data
-        assert data["token_type"] == "bearer"
-        assert data["expires_in"] == 600
-    
-    def test_auth_invalid_machine_id(self, client):
-        """Test authentication with invalid machine ID."""
-        response = client.post(
-            "/api/v1/auth/token",
-            json={
-                "machine_id": "NONEXISTENT",
-                "password": "test_password",
-            },
-        )
-        
-        assert response.status_code == 401
-    
-    def test_auth_invalid_password(self, client, test_client_obj):
-        """Test authentication with invalid password."""
-        response = client.post(
-            "/api/v1/auth/token",
-            json={
-                "machine_id": "TEST-KIOSK-001",
-                "password": "wrong_password",
-            },
-        )
-        
-        assert response.status_code == 401
-    
+
+        assert response.status_code == expected
+        if expected == 200:
+            data = response.json()
+            assert "access_token" in data
+            assert data["token_type"] == "bearer"
+            assert data["expires_in"] == 600
+
+
     def test_auth_inactive_client(self, client, db_session):
         """Test authentication with inactive client."""
         inactive_client = Client(
@@ -70,18 +58,29 @@ class TestAuthEndpoint:
         
         assert response.status_code == 403
     
-    def test_auth_rate_limiting(self, client, test_client_obj):
+    @pytest.mark.asyncio
+    async def test_auth_rate_limiting(self, client, test_client_obj):
         """Test rate limiting on auth endpoint."""
-        # Make multiple requests quickly
-        for _ in range(10):
-            response = client.post(
-                "/api/v1/auth/token",
-                json={
-                    "machine_id": "TEST-KIOSK-001",
-                    "password": "test_password",
-                },
+        from httpx import ASGITransport, AsyncClient
+        from app.main import app
+
+        body = {
+            "machine_id": "TEST-KIOSK-001",
+            "password": "test_password",
+        }
+        # Concurrent in-process requests: one RTT of wall time for all
+        # ten, and simultaneous arrivals exercise the limiter's atomic
+        # token bucket the way real bursts do. The sync client fixture
+        # is still requested so its get_db override is installed on app.
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as ac:
+            responses = await asyncio.gather(
+                *(ac.post("/api/v1/auth/token", json=body) for _ in range(10))
             )
-        
-        # Should eventually hit rate limit (if configured)
-        # Note: This test may need adjustment based on rate limit settings
+
+        # The limiter fails open when Redis is unavailable (as in unit
+        # tests), so a 429 is possible but not guaranteed here; every
+        # response must still be a success or a rate-limit rejection
+        assert all(r.status_code in (200, 429) for r in responses)
 
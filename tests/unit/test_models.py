@@ -17,8 +17,8 @@ class TestClientModel:
             is_active=True,
         )
         db_session.add(client)
-        db_session.commit()
-        
+        db_session.flush()
+
         assert client.id is not None
         assert client.machine_id == "TEST-KIOSK-001"
         assert client.is_active is True
@@ -61,8 +61,8 @@ class TestPaymentRequestModel:
             monitor_until=datetime.now(timezone.utc) + timedelta(seconds=120),
         )
         db_session.add(payment)
-        db_session.commit()
-        
+        db_session.flush()
+
         assert payment.id is not None
         assert payment.client_id == test_client_obj.id
         assert payment.external_code == "ORDER-123"
@@ -81,17 +81,17 @@ class TestPaymentRequestModel:
             monitor_until=datetime.now(timezone.utc) + timedelta(seconds=120),
         )
         db_session.add(payment)
-        db_session.commit()
-        
+        db_session.flush()
+
         # Transition to PENDING
         payment.status = PaymentRequest.STATUS_PENDING
-        db_session.commit()
+        db_session.flush()
         assert payment.status == PaymentRequest.STATUS_PENDING
-        
+
         # Transition to PAID
         payment.status = PaymentRequest.STATUS_PAID
         payment.finalized_at = datetime.now(timezone.utc)
-        db_session.commit()
+        db_session.flush()
         assert payment.status == PaymentRequest.STATUS_PAID
         assert payment.finalized_at is not None
 
@@ -125,8 +125,8 @@ class TestProviderInvoiceModel:
             raw_create_response={"id": "BTCPAY-INV-123"},
         )
         db_session.add(invoice)
-        db_session.commit()
-        
+        db_session.flush()
+
         assert invoice.id is not None
         assert invoice.payment_request_id == payment.id
         assert invoice.provider == "BTCPAY"
@@ -160,8 +160,8 @@ class TestPaymentEventModel:
             payload={"test": True},
         )
         db_session.add(event)
-        db_session.commit()
-        
+        db_session.flush()
+
         assert event.id is not None
         assert event.payment_request_id == payment.id
         assert event.event_type == PaymentEvent.EVENT_CREATED
@@ -1,4 +1,5 @@
 """Unit tests for security module."""
+import functools
 import pytest
 from app.core.security import (
     hash_password,
@@ -13,29 +14,25 @@ from app.core.security import (
 class TestPasswordHashing:
     """Test password hashing functionality."""
     
-    def test_hash_password(self):
+    def test_hash_password(self, argon2_test_vector):
         """Test password hashing."""
-        password = "test_password_123"
-        hashed = hash_password(password)
-        
-        assert hashed != password
+        hashed = argon2_test_vector["hash"]
+
+        assert hashed != argon2_test_vector["password"]
         assert len(hashed) > 0
         assert hashed.startswith("$argon2id$")
-    
-    def test_verify_password_correct(self):
+
+    def test_verify_password_correct(self, argon2_test_vector):
         """Test password verification with correct password."""
-        password = "test_password_123"
-        hashed = hash_password(password)
-        
-        assert verify_password(password, hashed) is True
-    
-    def test_verify_password_incorrect(self):
+        assert verify_password(
+            argon2_test_vector["password"], argon2_test_vector["hash"]
+        ) is True
+
+    def test_verify_password_incorrect(self, argon2_test_vector):
         """Test password verification with incorrect password."""
-        password = "test_password_123"
-        wrong_password = "wrong_password"
-        hashed = hash_password(password)
-        
-        assert verify_password(wrong_password, hashed) is False
+        assert verify_password(
+            "wrong_password", argon2_test_vector["hash"]
+        ) is False
     
     def test_different_passwords_different_hashes(self):
         """Test that different passwords produce different hashes."""
@@ -45,31 +42,33 @@ class TestPasswordHashing:
         assert hash1 != hash2
 
 
+# Signed once for the identical inputs both token tests use; a plain
+# cached helper (not a fixture) so a signing failure still surfaces
+# inside the test that called it
+@functools.lru_cache(maxsize=1)
+def _sample_jwt():
+    return create_access_token("test-client-id", "TEST-KIOSK-001")
+
+
 class TestJWT:
     """Test JWT token functionality."""
-    
+
     def test_create_token(self):
         """Test JWT token creation."""
-        client_id = "test-client-id"
-        machine_id = "TEST-KIOSK-001"
-        
-        token = create_access_token(client_id, machine_id)
-        
+        token = _sample_jwt()
+
         assert token is not None
         assert isinstance(token, str)
         assert len(token) > 0
-    
+
     def test_verify_token_valid(self):
         """Test token verification with valid token."""
-        client_id = "test-client-id"
-        machine_id = "TEST-KIOSK-001"
-        
-        token = create_access_token(client_id, machine_id)
+        token = _sample_jwt()
         payload = verify_token(token)
-        
+
         assert payload is not None
-        assert payload["sub"] == client_id
-        assert payload["mid"] == machine_id
+        assert payload["sub"] == "test-client-id"
+        assert payload["mid"] == "TEST-KIOSK-001"
         assert "exp" in payload
         assert "iat" in payload
         assert "jti" in payload
@@ -96,35 +95,17 @@ class TestHMAC:
         assert isinstance(signature, str)
         assert len(signature) == 64  # SHA256 hex length
     
-    def test_verify_signature_valid(self):
-        """Test HMAC signature verification with valid signature."""
-        payload = b"test payload"
-        secret = "test_secret"
-        
-        signature = generate_hmac_signature(payload, secret)
-        is_valid = verify_hmac_signature(payload, signature, secret)
-        
-        assert is_valid is True
-    
-    def test_verify_signature_invalid(self):
-        """Test HMAC signature verification with invalid signature."""
-        payload = b"test payload"
-        secret = "test_secret"
-        wrong_secret = "wrong_secret"
-        
-        signature = generate_hmac_signature(payload, secret)
-        is_valid = verify_hmac_signature(payload, signature, wrong_secret)
-        
-        assert is_valid is False
-    
-    def test_verify_signature_tampered_payload(self):
-        """Test HMAC signature verification with tampered payload."""
-        payload = b"test payload"
-        tampered_payload = b"tampered payload"
-        secret = "test_secret"
-        
-        signature = generate_hmac_signature(payload, secret)
-        is_valid = verify_hmac_signature(tampered_payload, signature, secret)
-        
-        assert is_valid is False
+    @pytest.mark.parametrize(
+        "verify_payload,verify_secret,expected",
+        [
+            (b"test payload", "test_secret", True),
+            (b"test payload", "wrong_secret", False),
+            (b"tampered payload", "test_secret", False),
+        ],
+        ids=["valid", "wrong_secret", "tampered_payload"],
+    )
+    def test_verify_signature(self, verify_payload, verify_secret, expected):
+        """Verify cases share one signed reference payload."""
+        signature = generate_hmac_signature(b"test payload", "test_secret")
+        assert verify_hmac_signature(verify_payload, signature, verify_secret) is expected
 